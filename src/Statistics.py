@@ -1,5 +1,4 @@
 import os
-import config_path
 
 class Statistics:
     def __init__(self):
@@ -10,6 +9,11 @@ class Statistics:
         self.prompt_tokens = 0
         self.completion_tokens = 0
         self.pass_num = 0
+        # 不调用 LLM、由本地规则或错误签名索引完成的修正次数
+        self.local_fixes = 0
+        # 命中与未命中 LLM 回复缓存的次数
+        self.llm_cache_hits = 0
+        self.llm_cache_misses = 0
 
     def reset(self):
         self.__init__()
@@ -19,29 +23,41 @@ class Statistics:
         self.total_tokens += other.total_tokens
         self.prompt_tokens += other.prompt_tokens
         self.completion_tokens += other.completion_tokens
+        self.local_fixes += other.local_fixes
+        self.llm_cache_hits += other.llm_cache_hits
+        self.llm_cache_misses += other.llm_cache_misses
 
     def average(self, count):
         self.loop /= count
         self.total_tokens /= count
         self.prompt_tokens /= count
         self.completion_tokens /= count
+        self.local_fixes /= count
+        self.llm_cache_hits /= count
+        self.llm_cache_misses /= count
 
     def display(self):
         print(f"Average Iterations: {self.loop}")
         print(f"Average Total Tokens: {self.total_tokens}")
         print(f"Average Prompt Tokens: {self.prompt_tokens}")
         print(f"Average Completion Tokens: {self.completion_tokens}")
+        print(f"Average Local Fixes: {self.local_fixes}")
+        print(f"Average LLM Cache Hits: {self.llm_cache_hits}")
+        print(f"Average LLM Cache Misses: {self.llm_cache_misses}")
         print(f"Total Pass Case: {self.pass_num}")
         
-    def save_to_file(self, directory):
+    def save_to_file(self, directory, status=''):
         os.makedirs(directory, exist_ok=True)
         file_path = os.path.join(directory, 'statistics.txt')
         with open(file_path, 'w') as f:
-            f.write(f"Status: {config_path.status}\n")
+            f.write(f"Status: {status}\n")
             f.write(f"Iterations: {self.loop}\n")
             f.write(f"Total Tokens: {self.total_tokens}\n")
             f.write(f"Prompt Tokens: {self.prompt_tokens}\n")
             f.write(f"Completion Tokens: {self.completion_tokens}\n")
+            f.write(f"Local Fixes: {self.local_fixes}\n")
+            f.write(f"LLM Cache Hits: {self.llm_cache_hits}\n")
+            f.write(f"LLM Cache Misses: {self.llm_cache_misses}\n")
 
     def save_ave_file(self, directory):
         os.makedirs(directory, exist_ok=True)
@@ -51,6 +67,7 @@ class Statistics:
             f.write(f"Total Tokens: {self.total_tokens}\n")
             f.write(f"Prompt Tokens: {self.prompt_tokens}\n")
             f.write(f"Completion Tokens: {self.completion_tokens}\n")
+            f.write(f"Local Fixes: {self.local_fixes}\n")
+            f.write(f"LLM Cache Hits: {self.llm_cache_hits}\n")
+            f.write(f"LLM Cache Misses: {self.llm_cache_misses}\n")
             f.write(f"Total Pass Case: {self.pass_num}\n")
-
-global_statistics = Statistics()
\ No newline at end of file
@@ -3,18 +3,32 @@
 import re
 from typing import List
 import os
+import copy
+import asyncio
 
 from metagpt.actions import Action
 from metagpt.schema import Message
 
-from qa_module import AsyncQA_Ori, AsyncQA_OpenFOAM_LLM
 import config_path
 import sys
 import glob
-from Statistics import global_statistics
-import subprocess
+from run_context import RunContext
+from actions.RunnerAction import RunnerAction
+import shutil
 import json
-from utils.util import log_with_time, read_dict_and_create_files, parser_allrun_script, parser_inputfiles
+from utils.util import log_with_time, update_case_files, parser_allrun_script, parser_inputfiles, copy_mesh_files, set_foam_dict_entry, get_foam_dict_entry, is_steady_case, get_solver_name
+from utils.divergence_rules import apply_divergence_rules, MIN_DELTA_T
+from utils.error_index import ErrorFixIndex, error_signature, apply_patch, diff_foamfiles
+from utils.mesh_cache import MESH_COMMAND_PATTERN
+
+# 投机修正：smoke_steps 为 0 时候选修正试运行的时间步数
+SPECULATIVE_SMOKE_STEPS = 20
+# 投机修正中由 LLM 生成的第 i 个候选使用 temperature + i * SPECULATIVE_TEMPERATURE_STEP
+SPECULATIVE_TEMPERATURE_STEP = 0.3
+MAX_TEMPERATURE = 1.5
+
+# 会重新初始化场的命令：续算时会覆盖最新时间步的结果
+INIT_COMMAND_PATTERN = re.compile(r'\b(setFields|potentialFoam|mapFields|applyBoundaryLayer|setExprFields)\b')
 
 class CorrectorAction(Action):
 
@@ -83,6 +97,22 @@ Use the following structure for the output:
     your code:
     """
 
+    CORRECT_FILE_PROMPT: str = """
+    to rewrite a OpenFoam {file_name} foamfile in {file_folder} folder that could solve the error:
+    ERROR INFO:
+    ```
+    {error}
+    ```
+    Please modify the input file according to the error message. If the error include "Unable to set reference cell for field p\nPlease supply either pRefCell or pRefPoint", you should add pRefCell and pRefValue in SIMPLE, PISO or PIMPLE. "residualControl" fields cannot appear in PIMPLE.
+    ORIGINAL INPUT FILES:
+    ```
+    {input_files}
+    ```
+    Note that you need to return ONLY the entire {file_folder}/{file_name} file in the same format as the input files, i.e. a JSON object with the single key "{file_folder}/{file_name}". Never return a single modified fragment or other files, making sure there are no other characters. No comments are allowed.
+    According to your task, return ```your_code_here ``` with NO other texts,
+    your code:
+    """
+
     CORRECT_DIVERGENCE_PROMPT: str = """
     to rewrite a OpenFOAM controlDict foamfile in system folder to solve divergence problems. Specifically, you can reduce deltaT by ten times.
     ORIGINAL INPUT FILES:
@@ -95,12 +125,11 @@ Use the following structure for the output:
     your code:
     """
 
-    async def run(self, with_messages:List[Message]=None, **kwargs) -> Message:
+    async def run(self, with_messages:List[Message]=None, run_ctx:RunContext=None, **kwargs) -> Message:
 
-        base_path = config_path.Case_PATH
+        base_path = run_ctx.case_path
         
         file_text, files_names,folder_names = self.read_files_into_dict(base_path)
-        os.chdir(base_path)
         error_info = with_messages[-1].content.split('<command>')[0]
         command = with_messages[-1].content.split('<command>')[1]
         # 在 with_messages 中找到最后一个 Corrector 消息
@@ -113,170 +142,396 @@ Use the following structure for the output:
         else:
             last_foamfiles = parser_inputfiles(with_messages[1].content)
 
-        requirement = config_path.description
+        requirement = run_ctx.description
         command = command.strip()
         log_with_time(f"command: {command}")
         log_with_time(f"requirement: {requirement}")
 
-        if global_statistics.loop >= config_path.max_loop:
+        if run_ctx.statistics.loop >= config_path.max_loop:
             log_with_time(f'Reach max loops: {config_path.max_loop}')
-            config_path.should_stop = True
+            run_ctx.should_stop = True
             log_with_time("should_stop")
             return "Reach max loop !"
-        elif global_statistics.Executability < 3:
-            global_statistics.loop = global_statistics.loop + 1
-            log_with_time(f'loop:{global_statistics.loop}')
+        elif run_ctx.statistics.Executability < 3:
+            run_ctx.statistics.loop = run_ctx.statistics.loop + 1
+            log_with_time(f'loop:{run_ctx.statistics.loop}')
 
         # 运行报错
         if error_info == "error" and command != "None":
 
-            command_err = f"{config_path.Case_PATH}/log.{command}"
+            command_err = f"{run_ctx.case_path}/log.{command}"
             error_content = self.read_error_content(command_err)
 
-            async_qa = AsyncQA_Ori()
-            
-            # 缺失文件
-            if "FOAM FATAL ERROR" in error_content and "cannot find file" in error_content:
-                # 获取当前文件夹下的所有文件
-                files = glob.glob(os.path.join(config_path.Case_PATH, '*'))
-                # 过滤出文件夹，即以'/'结尾的路径
-                dirs = [f for f in files if os.path.isdir(f)]
-                all_files = []
-                for dir in dirs:
-                    for f in glob.glob(os.path.join(dir, '*')):
-                        if os.path.isfile(f):
-                            all_files.append(f)
-                cur_file_list = [os.path.relpath(f, config_path.Case_PATH) for f in all_files]
-
-                prompt_judge_missing_file = self.JUDGE_MISSING_FILE_PROMPT.format(input_files=last_foamfiles, error_content=error_content, input_file_list=cur_file_list)
-                log_with_time(f'prompt_judge_missing_file: {prompt_judge_missing_file}')
-                missing_file_name = await async_qa.ask(prompt_judge_missing_file)
-                log_with_time(f'missing_file_name: {missing_file_name}')
-                prompt_missing_file = self.MISSING_FILE_PROMPT.format(missing_file_name=missing_file_name, requirement=requirement, input_files=last_foamfiles)
-                log_with_time(f'prompt_missing_file:\n{prompt_missing_file}')
-                rsp_input_files = await async_qa.ask(prompt_missing_file)
-                input_files = self.parse_inputfiles(rsp_input_files)
-            # 不缺失文件
-            else:
-                prompt_final = self.FIND_PRPMPT.format(command=command, error=error_content, file_list=files_names, folder_list=folder_names)
-                log_with_time(f'related_file_rsp_prompt:\n{prompt_final}')
-
-                related_file_rsp = await async_qa.ask(prompt_final)
-                log_with_time(f'related_file_rsp: {related_file_rsp}')
-
-                files_names_rewirte = self.parse_file_list(related_file_rsp)
-                log_with_time(f'files_names_rewirte:{files_names_rewirte}')
-
-                file_folders_rewirte = self.parse_folder_name(related_file_rsp)
-                files_names_rewirte = [name.strip().strip("'") for name in files_names_rewirte.split(',')]
-                file_folders_rewirte = [folder.strip().strip("'") for folder in file_folders_rewirte.split(',')]
-
-                n_rewrite = len(files_names_rewirte)
-                log_with_time(f"n_rewrite: {n_rewrite}")
-                log_with_time(f"files_names_rewirte: {files_names_rewirte}")
-
-                # 每次重写一个文件
-                if files_names_rewirte:
-                    input_files = last_foamfiles
-                    for file in files_names_rewirte:
-                        try:
-                            file_folder = folder_names[file]
-                            
-                            prompt_rewrite = self.CORRECT_PROMPT.format(file_name=file, file_folder=file_folder, error=error_content, input_files=input_files)
-                            log_with_time(f'prompt_rewrite:\n{prompt_rewrite}')
-                            rewrite_rsp = await async_qa.ask(prompt_rewrite)
-                            # log_with_time(f'rewrite_rsp:\n{rewrite_rsp}')
-                            input_files = self.parse_inputfiles(rewrite_rsp)
-                            # log_with_time(f'input_files after parse:\n{input_files}')
-                        except KeyError:
-                            continue
-                else:
-                    return "error but no rewritable files"
-            # 重写整个文件（可以尝试重写部分文件）
+            # 错误签名索引中的候选修正（按成功率排序），命中时不再调用 LLM
+            signature = error_signature(error_content)
             try:
-                subprocess.run(f'rm -rf {config_path.Case_PATH}', shell=True, check=True, capture_output=True)
+                last_files_dict = json.loads(last_foamfiles, strict=False)
+            except json.JSONDecodeError:
+                last_files_dict = None
+            solver = get_solver_name(run_ctx.case_path) if os.path.exists(f"{run_ctx.case_path}/system/controlDict") else None
+            candidates = []
+            if config_path.error_index and last_files_dict is not None:
+                for ops, source, score in ErrorFixIndex(config_path.error_index_path).candidates(signature, solver, last_files_dict):
+                    patched_files = copy.deepcopy(last_files_dict)
+                    # 已经应用过（不改变输入文件）的修正跳过
+                    if apply_patch(patched_files, ops):
+                        candidates.append({'input_files': json.dumps(patched_files, indent=4), 'ops': ops, 'source': source, 'score': score})
+
+            if config_path.speculative_corrections > 1:
+                correction = await self.speculative_correction(run_ctx, candidates, error_content, command, last_foamfiles, files_names, folder_names)
+            elif candidates:
+                correction = candidates[0]
+            else:
+                correction = await self.llm_correction(run_ctx, error_content, command, last_foamfiles, files_names, folder_names)
+            if correction is None:
+                return "error but no rewritable files"
+            input_files = correction['input_files']
+            if correction['source'] != 'llm':
+                log_with_time(f"apply {correction['source']} fix (score {correction['score']:.2f}) for error:\n{signature}\n{correction['ops']}")
+                run_ctx.statistics.local_fixes += 1
+
+            # 记录本次修正，下一次运行后按报错的命令是否正常运行更新错误签名索引
+            ops = correction.get('ops')
+            if ops is None and last_files_dict is not None:
+                # LLM 的修正只记录与报错相关的文件中的修改，重写时顺带改动的其他文件与本错误无关
                 try:
-                    input_files_dict = json.loads(input_files, strict=False)
-                except json.JSONDecodeError as e:
-                    log_with_time(f"解析JSON数据时出现错误: {e}")
-                    input_files_dict = {}
-                read_dict_and_create_files(input_files_dict, config_path.Case_PATH)
-                # 复制 mesh 文件
-                mesh_path_list = config_path.mesh_path.split(';')
-                for mesh_path in mesh_path_list:
-                    system_index = mesh_path.rfind('system/')
-                    constant_index = mesh_path.rfind('constant/')
-                    if system_index > 0:
-                        rel_mesh_path = mesh_path[system_index:]
-                    elif constant_index > 0:
-                        rel_mesh_path = mesh_path[constant_index:]
-
-                    source_mesh_path = mesh_path
-                    destination_mesh_path = os.path.join(config_path.Case_PATH, rel_mesh_path)
-                    # 确保文件的目录存在
-                    os.makedirs(os.path.dirname(destination_mesh_path), exist_ok=True)
-                    subprocess.run(f'cp {source_mesh_path} {destination_mesh_path}', shell=True, check=True, capture_output=True)
-                    log_with_time(f"copy mesh file: {source_mesh_path} to {destination_mesh_path}")
-            except subprocess.CalledProcessError as e:
-                log_with_time(f"When remove old case:{config_path.Case_PATH}, meet Error: {e}")
+                    ops = [op for op in diff_foamfiles(last_files_dict, json.loads(input_files, strict=False))
+                           if op['path'][0] in correction['files']]
+                except json.JSONDecodeError:
+                    ops = None
+            if ops and config_path.error_index:
+                run_ctx.pending_fix = {'signature': signature, 'solver': solver, 'ops': ops, 'source': correction['source'], 'command': command}
+            # 只重写有变化的文件
+            self.update_case(run_ctx.case_path, last_foamfiles, input_files)
             return input_files
         # 求解发散
         elif error_info == "divergence":
+            if run_ctx.divergence is not None:
+                log_with_time(f"divergence at Time = {run_ctx.divergence['time']} in {run_ctx.divergence['file']}: {run_ctx.divergence['reason']}")
             # 获取 deltaT
             try:
                 foamfiles = json.loads(last_foamfiles)
             except json.JSONDecodeError as e:
                 log_with_time(f"解析JSON数据时出现错误: {e}")
                 foamfiles = {}
-                config_path.should_stop = True
+                run_ctx.should_stop = True
                 return last_foamfiles
             deltaT = float(foamfiles['system/controlDict']['deltaT'])
 
             # 修改输入文件
-            async_qa = AsyncQA_Ori()
-            if deltaT <= 1e-5:
-                config_path.should_stop = True
+            async_qa = run_ctx.qa_ori
+            if deltaT <= MIN_DELTA_T:
+                run_ctx.should_stop = True
                 return last_foamfiles
             
-            # 将 controlDict 中的 deltaT 除以 10
-            prompt_rewrite = self.CORRECT_DIVERGENCE_PROMPT.format(input_files=last_foamfiles)
-            log_with_time(f'prompt_rewrite:\n{prompt_rewrite}')
-            rewrite_rsp = await async_qa.ask(prompt_rewrite)
-            input_files = self.parse_inputfiles(rewrite_rsp)
-
-            # 创建新的文件目录
-            try:
-                subprocess.run(f'rm -rf {config_path.Case_PATH}', shell=True, check=True, capture_output=True)
-                try:
-                    input_files_dict = json.loads(input_files, strict=False)
-                except json.JSONDecodeError as e:
-                    log_with_time(f"解析JSON数据时出现错误: {e}")
-                    input_files_dict = {}
-                read_dict_and_create_files(input_files_dict, config_path.Case_PATH)
-                # 复制 mesh 文件
-                mesh_path_list = config_path.mesh_path.split(';')
-                for mesh_path in mesh_path_list:
-                    system_index = mesh_path.rfind('system/')
-                    constant_index = mesh_path.rfind('constant/')
-                    if system_index > 0:
-                        rel_mesh_path = mesh_path[system_index:]
-                    elif constant_index > 0:
-                        rel_mesh_path = mesh_path[constant_index:]
-
-                    source_mesh_path = mesh_path
-                    destination_mesh_path = os.path.join(config_path.Case_PATH, rel_mesh_path)
-                    # 确保文件的目录存在
-                    os.makedirs(os.path.dirname(destination_mesh_path), exist_ok=True)
-                    subprocess.run(f'cp {source_mesh_path} {destination_mesh_path}', shell=True, check=True, capture_output=True)
-                    log_with_time(f"copy mesh file: {source_mesh_path} to {destination_mesh_path}")
-            except subprocess.CalledProcessError as e:
-                log_with_time(f"When remove old case:{config_path.Case_PATH}, meet Error: {e}")
+            # 先应用确定性规则（缩小 deltaT、自适应时间步长、亚松弛因子），没有适用的规则时再由 LLM 修改
+            applied_rules = apply_divergence_rules(foamfiles, is_steady_case(run_ctx.case_path)) if config_path.divergence_rules else []
+            if applied_rules:
+                log_with_time(f"divergence rules: {applied_rules}")
+                run_ctx.statistics.local_fixes += 1
+                input_files = json.dumps(foamfiles, indent=4)
+            else:
+                # 将 controlDict 中的 deltaT 除以 10
+                prompt_rewrite = self.CORRECT_DIVERGENCE_PROMPT.format(input_files=last_foamfiles)
+                log_with_time(f'prompt_rewrite:\n{prompt_rewrite}')
+                rewrite_rsp = await async_qa.ask(prompt_rewrite)
+                input_files = self.parse_inputfiles(rewrite_rsp)
+
+            # 更新 case 目录，可选从发散前最后写出的时间步继续计算
+            restart_time = None
+            if config_path.restart_on_divergence and run_ctx.divergence is not None:
+                restart_time = self.find_restart_time(run_ctx.case_path, run_ctx.divergence['time'])
+                log_with_time(f"restart_time: {restart_time}")
+            self.update_case(run_ctx.case_path, last_foamfiles, input_files, restart_time=restart_time)
             return input_files
         elif error_info == "timeout":
             return "timeout"
         elif error_info == "convergence":
             return "convergence"
     
+    async def speculative_correction(self, run_ctx, candidates, error_content, command, last_foamfiles, files_names, folder_names):
+        """
+        投机修正：凑齐 speculative_corrections 个候选修正（错误签名索引中的修正不足时由 LLM 以不同温度并发生成），
+        每个候选在各自的兄弟目录 {case_path}_spec{i} 中并行试运行，第一个通过的候选胜出，其余试运行被取消。
+
+        Returns:
+            dict: 胜出的候选 {'input_files', 'source', ...}；都没有通过时返回排序最靠前的候选，没有候选时返回 None。
+        """
+        n_candidates = config_path.speculative_corrections
+        candidates = candidates[:n_candidates]
+        temperatures = [min(MAX_TEMPERATURE, config_path.temperature + i * SPECULATIVE_TEMPERATURE_STEP)
+                        for i in range(n_candidates - len(candidates))]
+        llm_results = await asyncio.gather(*[self.llm_correction(run_ctx, error_content, command, last_foamfiles, files_names, folder_names, temperature=temperature)
+                                             for temperature in temperatures])
+        for correction in llm_results:
+            if correction is not None and all(correction['input_files'] != candidate['input_files'] for candidate in candidates):
+                candidates.append(correction)
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+
+        runner = RunnerAction()
+        tasks = [asyncio.create_task(self.try_candidate(runner, run_ctx.case_path, index, candidate, last_foamfiles))
+                 for index, candidate in enumerate(candidates)]
+        winner = None
+        try:
+            for finished in asyncio.as_completed(tasks):
+                candidate, result = await finished
+                if result == "convergence":
+                    winner = candidate
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if winner is None:
+            log_with_time(f"no speculative correction passed the smoke run, use the first of {len(candidates)} candidates")
+            return candidates[0]
+        log_with_time(f"speculative correction {candidates.index(winner)} ({winner['source']}) passed the smoke run")
+        return winner
+
+    async def try_candidate(self, runner, case_path, index, candidate, last_foamfiles):
+        """在 {case_path}_spec{index} 中应用候选修正并试运行。"""
+        spec_path = f"{case_path}_spec{index}"
+        if os.path.exists(spec_path):
+            shutil.rmtree(spec_path)
+        try:
+            shutil.copytree(case_path, spec_path, ignore=shutil.ignore_patterns('processor*', 'log.*', 'Allrun.out', 'Allrun.err'))
+            self.update_case(spec_path, last_foamfiles, candidate['input_files'], keep_allrun=True)
+            runner.reduce_smoke_case(spec_path, config_path.smoke_steps or SPECULATIVE_SMOKE_STEPS, config_path.coarse_factor)
+            result, _ = await runner.run_case(spec_path, calibrate=False)
+            log_with_time(f"[INFO SPECULATIVE] {spec_path}: {result}")
+            return candidate, result
+        except (OSError, IndexError) as e:
+            # 某个候选无法运行不影响其他候选
+            log_with_time(f"[INFO SPECULATIVE] {spec_path}: {e}")
+            return candidate, "error"
+        finally:
+            shutil.rmtree(spec_path, ignore_errors=True)
+
+    async def llm_correction(self, run_ctx, error_content, command, last_foamfiles, files_names, folder_names, temperature=None):
+        """
+        由 LLM 修正报错：缺失文件时补充文件，否则找到相关文件并逐个（或并发）重写。
+
+        Returns:
+            dict: {'input_files': 修正后输入文件的 JSON 字符串, 'source': 'llm', 'files': 与报错相关的文件（补充的文件或重写的文件）}，
+                没有可重写的文件时返回 None。
+        """
+        async_qa = run_ctx.qa_ori
+        requirement = run_ctx.description
+
+        # 缺失文件
+        if "FOAM FATAL ERROR" in error_content and "cannot find file" in error_content:
+            # 获取当前文件夹下的所有文件
+            files = glob.glob(os.path.join(run_ctx.case_path, '*'))
+            # 过滤出文件夹，即以'/'结尾的路径
+            dirs = [f for f in files if os.path.isdir(f)]
+            all_files = []
+            for dir in dirs:
+                for f in glob.glob(os.path.join(dir, '*')):
+                    if os.path.isfile(f):
+                        all_files.append(f)
+            cur_file_list = [os.path.relpath(f, run_ctx.case_path) for f in all_files]
+
+            prompt_judge_missing_file = self.JUDGE_MISSING_FILE_PROMPT.format(input_files=last_foamfiles, error_content=error_content, input_file_list=cur_file_list)
+            log_with_time(f'prompt_judge_missing_file: {prompt_judge_missing_file}')
+            missing_file_name = await async_qa.ask(prompt_judge_missing_file, temperature=temperature)
+            log_with_time(f'missing_file_name: {missing_file_name}')
+            prompt_missing_file = self.MISSING_FILE_PROMPT.format(missing_file_name=missing_file_name, requirement=requirement, input_files=last_foamfiles)
+            log_with_time(f'prompt_missing_file:\n{prompt_missing_file}')
+            rsp_input_files = await async_qa.ask(prompt_missing_file, temperature=temperature)
+            input_files = self.parse_inputfiles(rsp_input_files)
+            # 补充的文件即与报错相关的文件
+            try:
+                last_files = json.loads(last_foamfiles, strict=False)
+                related_files = [rel_path for rel_path in json.loads(input_files, strict=False) if rel_path not in last_files]
+            except json.JSONDecodeError:
+                related_files = []
+        # 不缺失文件
+        else:
+            prompt_final = self.FIND_PRPMPT.format(command=command, error=error_content, file_list=files_names, folder_list=folder_names)
+            log_with_time(f'related_file_rsp_prompt:\n{prompt_final}')
+
+            related_file_rsp = await async_qa.ask(prompt_final, temperature=temperature)
+            log_with_time(f'related_file_rsp: {related_file_rsp}')
+
+            files_names_rewirte = self.parse_file_list(related_file_rsp)
+            log_with_time(f'files_names_rewirte:{files_names_rewirte}')
+
+            file_folders_rewirte = self.parse_folder_name(related_file_rsp)
+            files_names_rewirte = [name.strip().strip("'") for name in files_names_rewirte.split(',')]
+            file_folders_rewirte = [folder.strip().strip("'") for folder in file_folders_rewirte.split(',')]
+
+            n_rewrite = len(files_names_rewirte)
+            log_with_time(f"n_rewrite: {n_rewrite}")
+            log_with_time(f"files_names_rewirte: {files_names_rewirte}")
+
+            rewrite_files = [(file, folder_names[file]) for file in files_names_rewirte if file in folder_names]
+            related_files = [f"{file_folder}/{file}" for file, file_folder in rewrite_files]
+            if config_path.concurrent_rewrite and len(rewrite_files) > 1:
+                # 基于同一份原始输入文件并发重写各个文件，每个请求只返回自己的文件，再合并
+                input_files = await self.concurrent_rewrite(async_qa, rewrite_files, error_content, last_foamfiles, temperature)
+            # 每次重写一个文件
+            elif files_names_rewirte:
+                input_files = last_foamfiles
+                for file in files_names_rewirte:
+                    try:
+                        file_folder = folder_names[file]
+                        
+                        prompt_rewrite = self.CORRECT_PROMPT.format(file_name=file, file_folder=file_folder, error=error_content, input_files=input_files)
+                        log_with_time(f'prompt_rewrite:\n{prompt_rewrite}')
+                        rewrite_rsp = await async_qa.ask(prompt_rewrite, temperature=temperature)
+                        # log_with_time(f'rewrite_rsp:\n{rewrite_rsp}')
+                        input_files = self.parse_inputfiles(rewrite_rsp)
+                        # log_with_time(f'input_files after parse:\n{input_files}')
+                    except KeyError:
+                        continue
+            else:
+                return None
+        return {'input_files': input_files, 'source': 'llm', 'files': related_files}
+
+    async def concurrent_rewrite(self, async_qa, rewrite_files, error_content, last_foamfiles, temperature=None):
+        """
+        并发重写多个文件：每个请求基于同一份原始输入文件只返回一个文件，按文件合并到原始输入文件中。
+
+        Args:
+            rewrite_files (list): [(文件名, 文件夹)]
+            last_foamfiles (str): 原始输入文件的 JSON 字符串。
+
+        Returns:
+            str: 合并后输入文件的 JSON 字符串；某个文件的回复无法解析或不含该文件时保留该文件的原始内容。
+        """
+        try:
+            merged_files = json.loads(last_foamfiles, strict=False)
+        except json.JSONDecodeError as e:
+            log_with_time(f"解析JSON数据时出现错误: {e}")
+            return last_foamfiles
+
+        async def rewrite(file, file_folder):
+            prompt_rewrite = self.CORRECT_FILE_PROMPT.format(file_name=file, file_folder=file_folder, error=error_content, input_files=last_foamfiles)
+            log_with_time(f'prompt_rewrite:\n{prompt_rewrite}')
+            return await async_qa.ask(prompt_rewrite, temperature=temperature)
+
+        rewrite_rsps = await asyncio.gather(*[rewrite(file, file_folder) for file, file_folder in rewrite_files])
+        for (file, file_folder), rewrite_rsp in zip(rewrite_files, rewrite_rsps):
+            rel_path = f"{file_folder}/{file}"
+            try:
+                rewritten = json.loads(self.parse_inputfiles(rewrite_rsp or ''), strict=False)
+            except json.JSONDecodeError as e:
+                log_with_time(f"rewrite of {rel_path} is not valid JSON, keep the original file: {e}")
+                continue
+            # 只取本文件；回复中没有以本文件路径为键的文件内容时保留原文件
+            file_content = rewritten.get(rel_path) if isinstance(rewritten, dict) else None
+            if not isinstance(file_content, dict):
+                log_with_time(f"rewrite of {rel_path} has no \"{rel_path}\" file, keep the original file")
+                continue
+            merged_files[rel_path] = file_content
+        return json.dumps(merged_files, indent=4)
+
+    def update_case(self, case_path, last_foamfiles, input_files, restart_time=None, keep_allrun=False):
+        """
+        按修正后的输入文件增量更新 case 目录，代替删除整个 case 后重新生成：
+        只重写有变化的文件，删除不再需要的文件，清除上一次运行的结果，保留网格与未变化的文件。
+
+        Args:
+            case_path (str): case 目录的绝对路径。
+            last_foamfiles (str): 修正前输入文件的 JSON 字符串。
+            input_files (str): 修正后输入文件的 JSON 字符串。
+            restart_time (str): 不为 None 时保留该时间步与 postProcessing，并设置 startFrom latestTime 从该时间步继续计算。
+            keep_allrun (bool): 保留 Allrun 与网格（用于投机修正的试运行目录，其 Allrun 不会重新生成）。
+        """
+        try:
+            input_files_dict = json.loads(input_files, strict=False)
+        except json.JSONDecodeError as e:
+            log_with_time(f"解析JSON数据时出现错误: {e}")
+            input_files_dict = None
+        try:
+            last_files_dict = json.loads(last_foamfiles, strict=False)
+        except json.JSONDecodeError:
+            last_files_dict = {}
+        if input_files_dict is not None:
+            changed_files = update_case_files(input_files_dict, case_path, last_files_dict)
+            log_with_time(f"changed files: {changed_files}")
+        else:
+            input_files_dict = last_files_dict
+
+        allrun_path = os.path.join(case_path, 'Allrun')
+        if os.path.exists(allrun_path) and not keep_allrun:
+            with open(allrun_path, 'r') as f:
+                modifies_mesh = MESH_COMMAND_PATTERN.search(f.read()) is not None
+            # Allrun 由 RunnerAction 根据 InputWriter 的输出重新生成
+            os.remove(allrun_path)
+            if modifies_mesh:
+                # 网格被 Allrun 中的网格工具修改过，删除后重新生成
+                shutil.rmtree(os.path.join(case_path, 'constant', 'polyMesh'), ignore_errors=True)
+
+        # 删除上一次运行写出的时间步与后处理结果，保留输入文件中的初始时间步
+        for name in os.listdir(case_path):
+            dir_path = os.path.join(case_path, name)
+            if not os.path.isdir(dir_path):
+                continue
+            if name == restart_time or (name == 'postProcessing' and restart_time is not None):
+                continue
+            if name == 'postProcessing' or (self.is_time_dir(name) and not any(rel_path.startswith(f"{name}/") for rel_path in input_files_dict)):
+                shutil.rmtree(dir_path)
+            elif self.is_time_dir(name):
+                # 初始时间步中由上一次运行写出的场（如 potentialFoam 写出的 phi）
+                for file in os.listdir(dir_path):
+                    if f"{name}/{file}" not in input_files_dict and os.path.isfile(os.path.join(dir_path, file)):
+                        os.remove(os.path.join(dir_path, file))
+
+        copy_mesh_files(config_path.mesh_path, case_path, update=True)
+
+        if restart_time is not None:
+            control_dict_path = os.path.join(case_path, 'system', 'controlDict')
+            set_foam_dict_entry(control_dict_path, 'startFrom', 'latestTime')
+            # 续算时 OpenFOAM 从 <time>/uniform/time 读取 deltaT，需要同步为修正后的 deltaT
+            delta_t = get_foam_dict_entry(control_dict_path, 'deltaT')
+            uniform_time_path = os.path.join(case_path, restart_time, 'uniform', 'time')
+            if delta_t is not None and os.path.exists(uniform_time_path):
+                for key in ('deltaT', 'deltaT0'):
+                    if get_foam_dict_entry(uniform_time_path, key) is not None:
+                        set_foam_dict_entry(uniform_time_path, key, delta_t)
+
+    def find_restart_time(self, case_path, divergence_time):
+        """
+        找到发散时间步之前最后一个完整写出的时间步目录。
+
+        Args:
+            case_path (str): case 目录的绝对路径。
+            divergence_time (str): 监控到发散的时间步。
+
+        Returns:
+            str: 时间步目录名；没有可用的时间步，或 Allrun 中含有会重新初始化场的命令（setFields 等）时返回 None。
+        """
+        allrun_path = os.path.join(case_path, 'Allrun')
+        if os.path.exists(allrun_path):
+            with open(allrun_path, 'r') as f:
+                if INIT_COMMAND_PATTERN.search(f.read()):
+                    return None
+        try:
+            divergence_time = float(divergence_time)
+        except (TypeError, ValueError):
+            return None
+        time_dirs = sorted((float(name), name) for name in os.listdir(case_path)
+                           if self.is_time_dir(name) and os.path.isdir(os.path.join(case_path, name)))
+        if len(time_dirs) < 2:
+            return None
+        initial_fields = {f for f in os.listdir(os.path.join(case_path, time_dirs[0][1])) if os.path.isfile(os.path.join(case_path, time_dirs[0][1], f))}
+        for value, name in reversed(time_dirs[1:]):
+            # 被终止时可能只写出了部分场
+            if value < divergence_time and initial_fields <= set(os.listdir(os.path.join(case_path, name))):
+                return name
+        return None
+
+    @staticmethod
+    def is_time_dir(name):
+        try:
+            float(name)
+            return True
+        except ValueError:
+            return False
+
     def read_files_into_dict(self, base_path):
         """
         将指定目录下的所有文件内容读取到一个字典中，并返回文件内容字典、文件名列表和文件夹名字典。
@@ -5,15 +5,19 @@ import os
 import sys
 from metagpt.actions import Action
 from metagpt.schema import Message
-from qa_module import AsyncQA_Ori, AsyncQA_OpenFOAM_LLM
 import config_path
-from Statistics import global_statistics
+from run_context import RunContext
+from qa_module import GenerationAborted
 
 import json
 import ast
 import subprocess
 from utils.butterfly.parser import CppDictParser
-from utils.util import log_with_time, read_dict_and_create_files, parser_inputfiles, correct_dimension
+from utils.util import log_with_time, read_dict_and_create_files, parser_inputfiles, correct_dimension, copy_mesh_files
+from utils.json_stream import FoamFilesStreamValidator
+
+# 流式生成时因内容无效中止后，最多立即重新生成的次数
+MAX_STREAM_ABORTS = 5
 
 class InputWriterAction(Action):
 
@@ -21,14 +25,17 @@ class InputWriterAction(Action):
 
     name: str = "InputWriterAction"
 
-    async def run(self, with_messages:List[Message]=None, **kwargs) -> Message:
+    async def run(self, with_messages:List[Message]=None, run_ctx:RunContext=None, **kwargs) -> Message:
         
         system_msg = self.SYSTEM_PROMPT
         prompt = with_messages[0].content
-        config_path.writter_prompt = prompt
-        config_path.writter_system = system_msg
-        async_qa_openfoam = AsyncQA_OpenFOAM_LLM()
-        inputfiles_rsp = await async_qa_openfoam.ask(prompt, system_msg)
+        run_ctx.writter_prompt = prompt
+        run_ctx.writter_system = system_msg
+        async_qa_openfoam = run_ctx.qa_openfoam_llm
+        mesh_path = config_path.mesh_path
+        mesh_content, patch_names = self.parse_mesh_file(mesh_path)
+
+        inputfiles_rsp = await self.ask_foam_files(async_qa_openfoam, prompt, system_msg, patch_names)
         log_with_time(f"inputfiles_rsp:\n{inputfiles_rsp}")
         inputfiles_json = ""
         while(inputfiles_json == ""):
@@ -36,15 +43,13 @@ class InputWriterAction(Action):
                 inputfiles_json = parser_inputfiles(inputfiles_rsp)
             except Exception as e:
                 log_with_time(f"解析 Foam Files 数据时出现错误: {e}")
-                inputfiles_rsp = await async_qa_openfoam.ask(prompt, system_msg)
+                inputfiles_rsp = await self.ask_foam_files(async_qa_openfoam, prompt, system_msg, patch_names)
         
         max_attempts = 5
         attempt_counter = 0
         boundary_fields_valid = False
         input_files_dict = {}
 
-        mesh_path = config_path.mesh_path
-        mesh_content, patch_names = self.parse_mesh_file(mesh_path)
         patches_list = []
         for patch_name in patch_names:
             patch = '\"' + patch_name + '\": {\"type\": \"xxx\", ...}'
@@ -67,46 +72,54 @@ class InputWriterAction(Action):
                     
             except json.JSONDecodeError as e:
                 log_with_time(f"解析 Foam Files 数据为 JSON 时出现错误: {e}\n正在重新生成 Foam Files")
-                inputfiles_rsp = await async_qa_openfoam.ask(prompt, system_msg)
+                inputfiles_rsp = await self.ask_foam_files(async_qa_openfoam, prompt, system_msg, patch_names)
                 inputfiles_json = parser_inputfiles(inputfiles_rsp)  # 假设这是用来解析响应的方法
                 attempt_counter += 1
                 
             except ValueError as e:
                 # 如果验证boundaryField失败，重新获取并解析数据
                 log_with_time(str(e))
-                inputfiles_rsp = await async_qa_openfoam.ask(prompt, system_msg)
+                inputfiles_rsp = await self.ask_foam_files(async_qa_openfoam, prompt, system_msg, patch_names)
                 inputfiles_json = parser_inputfiles(inputfiles_rsp)
                 attempt_counter += 1
                     
         
         if input_files_dict == {}:
             log_with_time(f"解析 Foam Files 失败")
-            sys.exit(0)
+            # 只结束本次运行，不影响同一事件循环中并发的其他运行
+            run_ctx.status = 'error'
+            run_ctx.should_stop = True
+            return inputfiles_rsp
         else:
             # 纠正 0/ 文件的 dimensions
             inputfiles_rsp, input_files_dict = correct_dimension(inputfiles_rsp, input_files_dict)
 
-        read_dict_and_create_files(input_files_dict, config_path.Case_PATH)
+        read_dict_and_create_files(input_files_dict, run_ctx.case_path)
 
         # 复制 mesh 文件
-        mesh_path_list = mesh_path.split(';')
-        for mesh_path in mesh_path_list:
-            system_index = mesh_path.rfind('system/')
-            constant_index = mesh_path.rfind('constant/')
-            if system_index > 0:
-                rel_mesh_path = mesh_path[system_index:]
-            elif constant_index > 0:
-                rel_mesh_path = mesh_path[constant_index:]
-
-            source_mesh_path = mesh_path
-            destination_mesh_path = os.path.join(config_path.Case_PATH, rel_mesh_path)
-            # 确保文件的目录存在
-            os.makedirs(os.path.dirname(destination_mesh_path), exist_ok=True)
-            subprocess.run(f'cp {source_mesh_path} {destination_mesh_path}', shell=True, check=True, capture_output=True)
-            log_with_time(f"copy mesh file: {source_mesh_path} to {destination_mesh_path}")
+        copy_mesh_files(mesh_path, run_ctx.case_path)
         
         return inputfiles_rsp
 
+    async def ask_foam_files(self, async_qa_openfoam, prompt, system_msg, patch_names):
+        """
+        生成 Foam Files。openfoam_llm_stream 打开时边生成边校验，JSON 结构出错或 0/U、0/p 缺少 patch 时
+        立即中止并重新生成，不必等待完整的回复；连续中止 MAX_STREAM_ABORTS 次后不再校验，交给后续的检查处理。
+        只有校验中止会在这里重新生成，超时、服务端报错等请求失败直接返回 None。
+
+        Returns:
+            str: 模型的回复，请求失败时为 None。
+        """
+        if not config_path.openfoam_llm_stream:
+            return await async_qa_openfoam.ask(prompt, system_msg)
+        for attempt in range(MAX_STREAM_ABORTS):
+            validator = FoamFilesStreamValidator(patch_names)
+            try:
+                return await async_qa_openfoam.ask(prompt, system_msg, validate=validator.feed)
+            except GenerationAborted:
+                log_with_time(f"Foam Files 生成中止，重新生成 ({attempt + 1}/{MAX_STREAM_ABORTS})")
+        return await async_qa_openfoam.ask(prompt, system_msg)
+
     def parse_mesh_file(self, mesh_path):
         # 不同的 mesh 文件用分号 ; 分隔
         mesh_path_list = mesh_path.split(';')
@@ -5,9 +5,8 @@ import os
 import sys
 from metagpt.actions import Action
 from metagpt.schema import Message
-from qa_module import AsyncQA_Ori, AsyncQA_OpenFOAM_LLM
 import config_path
-from Statistics import global_statistics
+from run_context import RunContext
 
 import json
 import ast
@@ -47,20 +46,16 @@ If the Initial boundary conditions is not sufficient, return '[File Name]: [Patc
 
     name: str = "PrecheckerAction"
 
-    async def run(self, with_messages:List[Message]=None, **kwargs) -> Message:
+    async def run(self, with_messages:List[Message]=None, run_ctx:RunContext=None, **kwargs) -> Message:
         # 1. 读取 mesh 文件
         # 2. 生成 inputfile
         # 3. 构建 case 目录
         # 4. 复制 blockMeshDict
 
-        case_name = config_path.case_name
-        if config_path.run_times > 1:
-            config_path.Case_PATH = f"{config_path.Run_PATH}/{case_name}_{global_statistics.runtimes}"
-        else:
-            config_path.Case_PATH = f"{config_path.Run_PATH}/{case_name}"
-        os.makedirs(config_path.Case_PATH, exist_ok=True)
+        # case 目录（{case_name} 或 {case_name}_{runtimes}）由 RunContext 确定
+        os.makedirs(run_ctx.case_path, exist_ok=True)
 
-        async_qa_ori = AsyncQA_Ori()
+        async_qa_ori = run_ctx.qa_ori
         requirement = with_messages[0].content
         log_with_time(f"requirement:{requirement}")
         description = requirement.split('<mesh_path>')[0]
@@ -78,12 +73,16 @@ If the Initial boundary conditions is not sufficient, return '[File Name]: [Patc
                 stop_flag = True
             else:
                 # log_with_time(f"rsp_supplement:{rsp_supplement}")
-                user_supplement = input(f"{'='*50}\n\nThe current problem is described as follows:\n\n{description}\n\n{'-'*50}\n\nPlease refer to the following prompts to supplement the problem description:\n\n{rsp_supplement}\n\n{'-'*50}\n\nYour input is valuable! Please enter your supplemental information below (or simply press 'Enter' to skip this step):\n\n{'='*50}\n")
+                try:
+                    user_supplement = input(f"{'='*50}\n\nThe current problem is described as follows:\n\n{description}\n\n{'-'*50}\n\nPlease refer to the following prompts to supplement the problem description:\n\n{rsp_supplement}\n\n{'-'*50}\n\nYour input is valuable! Please enter your supplemental information below (or simply press 'Enter' to skip this step):\n\n{'='*50}\n")
+                except EOFError:
+                    # 非交互运行（如 benchmark.py 的 worker 进程）没有 stdin，直接跳过补充
+                    user_supplement = ''
                 if user_supplement == '':
                     stop_flag = True
                 else:
                     description += user_supplement
-        config_path.description = description
+        run_ctx.description = description
 
         patches_list = []
         for patch_name in patch_names:
@@ -1,6 +1,8 @@
 
 import re
-import subprocess
+import asyncio
+import collections
+import time
 from typing import List
 import os
 import shutil
@@ -8,14 +10,22 @@ import shutil
 from metagpt.actions import Action
 from metagpt.schema import Message
 
-from qa_module import AsyncQA_Ori
 import config_path
 import sys
 import glob
 import signal
 import json
-from Statistics import global_statistics
-from utils.util import log_with_time, parser_inputfiles, parser_allrun_script
+from run_context import RunContext
+from utils.util import log_with_time, parser_inputfiles, parser_allrun_script, set_foam_dict_entry, is_steady_case, get_solver_name
+from utils.log_monitor import FoamLogMonitor
+from utils.cost_model import CostModel, progress_eta, count_cells, read_time_range, time_dirs
+from utils.coarse_mesh import coarsen_block_mesh_dict
+from utils.mesh_cache import MeshCache
+from utils.error_index import ErrorFixIndex, error_signature
+from utils.butterfly.decomposeParDict import DecomposeParDict
+
+# 运行期间输出进度与剩余时间的间隔（秒）
+PROGRESS_INTERVAL = 60
 
 class RunnerAction(Action):
 
@@ -33,9 +43,9 @@ class RunnerAction(Action):
         # Return:
     """
     
-    async def run(self, with_messages:List[Message]=None, **kwargs) -> Message:
+    async def run(self, with_messages:List[Message]=None, run_ctx:RunContext=None, **kwargs) -> Message:
 
-        allrun_file_path = f'{config_path.Case_PATH}/Allrun'
+        allrun_file_path = f'{run_ctx.case_path}/Allrun'
 
         allrun_write = "None"
 
@@ -47,7 +57,7 @@ class RunnerAction(Action):
                 log_with_time(f'allrun_write2:\n{allrun_write}')
 
         if allrun_write == "None":
-            async_qa_allrun = AsyncQA_Ori()
+            async_qa_allrun = run_ctx.qa_ori
 
             InputWritter_output = with_messages[0].content
             allrun_write = parser_allrun_script(InputWritter_output)
@@ -61,20 +71,20 @@ class RunnerAction(Action):
                 
         log_with_time(f'allrun_write:\n{allrun_write}')
 
-        if os.path.exists(os.path.join(config_path.Case_PATH, 'constant', 'polyMesh')):
+        if os.path.exists(os.path.join(run_ctx.case_path, 'constant', 'polyMesh')):
             self.remove_lines_with_string(allrun_file_path, "blockMesh")
 
-        out_file = os.path.join(config_path.Case_PATH, 'Allrun.out')
-        err_file = os.path.join(config_path.Case_PATH, 'Allrun.err')
+        out_file = os.path.join(run_ctx.case_path, 'Allrun.out')
+        err_file = os.path.join(run_ctx.case_path, 'Allrun.err')
 
-        self.remove_log_files(config_path.Case_PATH)
+        self.remove_log_files(run_ctx.case_path)
         if os.path.exists(err_file):
             os.remove(err_file)
         if os.path.exists(out_file):
             os.remove(out_file)
-        self.remove_err_files(config_path.Case_PATH)
-        self.remove_pro_files(config_path.Case_PATH)
-        dir_path = config_path.Case_PATH
+        self.remove_err_files(run_ctx.case_path)
+        self.remove_pro_files(run_ctx.case_path)
+        dir_path = run_ctx.case_path
         initial_files = {}
         for subdir in os.listdir(dir_path):
             subdir_path = os.path.join(dir_path, subdir)
@@ -83,10 +93,23 @@ class RunnerAction(Action):
 
         log_with_time(f"initial_files:{initial_files}")
 
-        run_result = self.process_case(config_path.Case_PATH, out_file, err_file)
+        run_result = "convergence"
+        if config_path.smoke_steps > 0 or config_path.coarse_factor > 1:
+            # 先在克隆的 case 中以很短的 endTime 或粗网格试运行，试运行就报错/发散的 case 不再启动完整运行
+            run_result, monitor = await self.smoke_run(run_ctx.case_path, config_path.smoke_steps, config_path.coarse_factor)
+
+        if run_result == "convergence":
+            n_procs = 1
+            if config_path.parallel:
+                n_procs = self.setup_parallel_run(run_ctx.case_path, allrun_file_path)
+            run_result, monitor = await self.run_case(run_ctx.case_path, n_procs=n_procs)
+        # 运行中监控到的发散信息（时间步与原因），供 CorrectorAction 使用
+        run_ctx.divergence = monitor.divergence
         
-        error_logs = self.check_foam_errors(config_path.Case_PATH)
+        error_logs = self.check_foam_errors(run_ctx.case_path)
         log_with_time(f'error_logs:{error_logs}')
+        if run_ctx.pending_fix is not None:
+            self.resolve_pending_fix(run_ctx, error_logs)
 
         commands_run = self.extract_commands_from_allrun_out(out_file)
         log_with_time(f"commands_run:{commands_run}")
@@ -96,24 +119,24 @@ class RunnerAction(Action):
         log_with_time(f"command:{command}")
 
         error_info = run_result
-        config_path.status = run_result
+        run_ctx.status = run_result
         if run_result == "convergence":
             result = "None"
-            global_statistics.Executability = 3
-            config_path.should_stop = True
+            run_ctx.statistics.Executability = 3
+            run_ctx.should_stop = True
         elif run_result == "divergence":
             result = "None"
-            global_statistics.Executability = 2
+            run_ctx.statistics.Executability = 2
         elif run_result == "error":
             result = command[0]['command']
             if "mesh" in result.lower():
-                global_statistics.Executability = 0
+                run_ctx.statistics.Executability = 0
             else:
-                global_statistics.Executability = 1
+                run_ctx.statistics.Executability = 1
         elif run_result == "timeout":
             result = "None"
-            global_statistics.Executability = 2
-        log_with_time(f"Executability: {global_statistics.Executability}")
+            run_ctx.statistics.Executability = 2
+        log_with_time(f"Executability: {run_ctx.statistics.Executability}")
 
         
 
@@ -132,22 +155,173 @@ class RunnerAction(Action):
             return allrun_rsp[left_index + len('```sh'):right_index]
 
 
-    def process_case(self, case_path, out_file, err_file):
+    async def run_case(self, case_path, n_procs=1, calibrate=True):
+        """
+        估计运行代价并在实时日志监控下运行 case 的 Allrun。
+
+        Args:
+            case_path (str): case 目录的绝对路径。
+            n_procs (int): MPI 并行进程数。
+            calibrate (bool): 收敛时是否用实际耗时标定代价模型。
+
+        Returns:
+            tuple: (运行结果 convergence/divergence/error/timeout, FoamLogMonitor)
+        """
+        out_file = os.path.join(case_path, 'Allrun.out')
+        err_file = os.path.join(case_path, 'Allrun.err')
+        mesh_cache = MeshCache(config_path.mesh_cache_path) if config_path.mesh_cache else None
+        if mesh_cache is not None and mesh_cache.restore(case_path):
+            # 网格输入未变，使用缓存的网格并跳过 blockMesh
+            self.remove_lines_with_string(os.path.join(case_path, 'Allrun'), "blockMesh")
+        cost_model = CostModel(config_path.cost_model_path, safety_factor=config_path.timeout_safety_factor, min_timeout=config_path.min_timeout, max_timeout=config_path.max_timeout, mesh_allowance=config_path.mesh_time_allowance)
+        cost_estimate = cost_model.estimate(case_path, n_procs=n_procs)
+        log_with_time(f"cost_estimate:{cost_estimate}")
+        monitor = FoamLogMonitor(case_path, max_courant=config_path.max_courant, max_residual=config_path.max_residual, max_continuity_error=config_path.max_continuity_error,
+                                 steady=config_path.steady_stop and is_steady_case(case_path), steady_tolerance=config_path.steady_tolerance,
+                                 steady_window=config_path.steady_window, steady_plateau=config_path.steady_plateau)
+        run_result = await self.process_case(case_path, out_file, err_file, monitor=monitor, cost_estimate=cost_estimate)
+        if mesh_cache is not None:
+            mesh_cache.store(case_path)
+        if run_result == "convergence" and calibrate and monitor.first_step_time is not None:
+            # 用求解器第一个时间步之后的实际耗时与实际时间步数标定该求解器的单位耗时，网格生成与 decomposePar 不计入
+            cost_model.update(cost_estimate['solver'], cost_estimate['cells'], monitor.steps, time.time() - monitor.first_step_time, n_procs=n_procs)
+        return run_result, monitor
+
+    async def smoke_run(self, case_path, n_steps=0, coarse_factor=1):
+        """
+        将 case 克隆到 {case_path}_smoke 后试运行：
+        n_steps > 0 时把 endTime 改为 startTime + n_steps * deltaT；
+        coarse_factor > 1 时把 blockMeshDict 各方向的划分数除以 coarse_factor，在粗网格上暴露边界条件、格式与求解器设置错误。
+        未通过时把日志复制回 case 目录，后续的错误分析与 CorrectorAction 不需要区分是否为试运行。
+
+        Returns:
+            tuple: (试运行结果 convergence/divergence/error/timeout, FoamLogMonitor)
+        """
+        smoke_path = f"{case_path}_smoke"
+        if os.path.exists(smoke_path):
+            shutil.rmtree(smoke_path)
+        shutil.copytree(case_path, smoke_path, ignore=shutil.ignore_patterns('processor*', 'log.*', 'Allrun.out', 'Allrun.err', 'postProcessing'))
+
+        if not self.reduce_smoke_case(smoke_path, n_steps, coarse_factor):
+            # 既不能缩短时间也不能粗化网格时，试运行与完整运行相同，直接跳过
+            shutil.rmtree(smoke_path)
+            return "convergence", FoamLogMonitor(case_path)
+
+        smoke_result, monitor = await self.run_case(smoke_path, calibrate=False)
+        log_with_time(f"[INFO SMOKE] {smoke_path}: {smoke_result}")
+        if smoke_result != "convergence":
+            for file_path in glob.glob(os.path.join(smoke_path, 'log.*')) + glob.glob(os.path.join(smoke_path, 'Allrun.*')):
+                if os.path.basename(file_path) != 'Allrun':
+                    shutil.copy(file_path, case_path)
+        shutil.rmtree(smoke_path, ignore_errors=True)
+        return smoke_result, monitor
+
+    def reduce_smoke_case(self, smoke_path, n_steps=0, coarse_factor=1):
+        """
+        原地缩小试运行用的 case：n_steps > 0 时把 endTime 改为 startTime + n_steps * deltaT，
+        startFrom 为 latestTime 时 startTime 为最新的时间步目录；
+        coarse_factor > 1 且 Allrun 运行 blockMesh 时把 blockMeshDict 各方向的划分数除以 coarse_factor，
+        从之前写出的时间步继续计算时该时间步的场与原网格对应，不粗化网格。
+
+        Returns:
+            bool: 是否缩短了时间或粗化了网格。
+        """
+        coarsened = False
+        block_mesh_dict_path = os.path.join(smoke_path, 'system', 'blockMeshDict')
+        with open(os.path.join(smoke_path, 'Allrun'), 'r') as f:
+            runs_block_mesh = 'blockMesh' in f.read()
+        start_time, _, delta_t = read_time_range(smoke_path)
+        dirs = time_dirs(smoke_path)
+        restarting = bool(dirs) and start_time is not None and start_time > dirs[0][0]
+        if coarse_factor > 1 and runs_block_mesh and not restarting and os.path.exists(block_mesh_dict_path):
+            coarsened = coarsen_block_mesh_dict(block_mesh_dict_path, coarse_factor)
+            if coarsened:
+                shutil.rmtree(os.path.join(smoke_path, 'constant', 'polyMesh'), ignore_errors=True)
+
+        if n_steps > 0:
+            control_dict_path = os.path.join(smoke_path, 'system', 'controlDict')
+            if start_time is not None and delta_t is not None:
+                set_foam_dict_entry(control_dict_path, 'endTime', f"{start_time + n_steps * delta_t:g}")
+                set_foam_dict_entry(control_dict_path, 'writeControl', 'timeStep')
+                set_foam_dict_entry(control_dict_path, 'writeInterval', str(n_steps))
+            else:
+                n_steps = 0
+
+        if coarsened or n_steps > 0:
+            log_with_time(f"[INFO SMOKE] {smoke_path}: run {n_steps or 'all'} time steps" + (f" on a mesh coarsened by {coarse_factor:g}" if coarsened else ""))
+        return coarsened or n_steps > 0
+
+    async def process_case(self, case_path, out_file, err_file, monitor=None, cost_estimate=None):
         # 执行 openfoam 指令
+        # 使用 asyncio 子进程，等待求解时不阻塞事件循环（其他 role、LLM 调用与并发运行可以继续）
+        # monitor (FoamLogMonitor) 不为 None 时，运行期间定期解析 log.*Foam，发散时立即终止
+        # cost_estimate (CostModel.estimate 的结果) 给出超时时间，并用于输出进度与剩余时间
         error_info = ""
-        timeout = 12 * 60 * 60 # 12 hours
+        timeout = cost_estimate['timeout'] if cost_estimate else 12 * 60 * 60 # 12 hours
+        last_progress_time = 0
+        loop = asyncio.get_running_loop()
         with open(out_file, 'w') as out, open(err_file, 'w') as err:
-            process = subprocess.Popen(f'bash {case_path}/Allrun', shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, preexec_fn=os.setsid)
+            # 在 case 目录中运行 Allrun（cwd 只作用于子进程），不依赖本进程的当前工作目录
+            # start_new_session: Allrun 及其启动的求解器位于独立的进程组，超时/取消时整体 kill
+            # stdout/stderr 直接写入 Allrun.out/Allrun.err，内存占用与输出量无关，运行中也可以 tail
+            process = await asyncio.create_subprocess_exec('bash', f'{case_path}/Allrun', cwd=case_path, stdout=out, stderr=err, start_new_session=True)
+            wait_task = asyncio.ensure_future(process.wait())
+            start_time = loop.time()
+            steady_stop_time = None
+            steady_killed = False
+            control_dict_content = None
             try:
-                stdout, stderr = process.communicate(timeout=timeout)
-                out.write(stdout)
-                err.write(stderr)
-                if process.returncode != 0:
+                while not wait_task.done():
+                    await asyncio.wait({wait_task}, timeout=min(config_path.monitor_interval, max(0, timeout - (loop.time() - start_time))))
+                    if monitor is not None and monitor.poll() is not None:
+                        error_info = f"Divergence at Time = {monitor.divergence['time']}: {monitor.divergence['reason']}"
+                        self.kill_process_group(process)
+                        await wait_task
+                        break
+                    if monitor is not None and monitor.converged is not None and not wait_task.done():
+                        if steady_stop_time is None:
+                            # 稳态残差已进入平台：通过 controlDict 的 stopAt writeNow 让求解器写出结果后正常结束
+                            steady_stop_time = loop.time()
+                            control_dict_content = self.request_write_now(case_path)
+                            log_with_time(f"[INFO STEADY] {case_path}: residuals below {monitor.converged['residual']:.3e} at Time = {monitor.converged['time']}, stopAt writeNow")
+                        elif loop.time() - steady_stop_time > 10 * config_path.monitor_interval:
+                            # runTimeModifiable 关闭时求解器不会重新读取 controlDict，此时直接结束（已写出的时间步仍然保留）
+                            self.kill_process_group(process)
+                            await wait_task
+                            steady_killed = True
+                            break
+                    if monitor is not None and cost_estimate and loop.time() - last_progress_time >= PROGRESS_INTERVAL:
+                        last_progress_time = loop.time()
+                        progress, eta = progress_eta(cost_estimate, monitor.time, loop.time() - start_time)
+                        if progress is not None:
+                            eta_text = f"{eta:.0f}s" if eta is not None else "unknown"
+                            log_with_time(f"[INFO PROGRESS] {case_path}: Time = {monitor.time}/{cost_estimate['end_time']} ({progress:.1%}), elapsed {loop.time() - start_time:.0f}s, ETA {eta_text}, timeout {timeout:.0f}s")
+                    if not wait_task.done() and loop.time() - start_time >= timeout:
+                        error_info = "Time out"
+                        self.kill_process_group(process)
+                        await wait_task
+                        # log_with_time(f"[INFO TIMEOUT] {case_path}: Process group {process.pid} has been killed.")
+                        break
+                if steady_stop_time is not None:
+                    self.restore_control_dict(case_path, control_dict_content)
+                if steady_killed:
+                    log_with_time(f"[INFO PASS]: {case_path} (steady-state convergence)")
+                    return 'convergence'
+                if error_info == "" and process.returncode != 0:
+                    stderr = self.read_file_tail(err_file)
                     error_info = f"Command failed with return code {process.returncode}: {stderr}"
-            except subprocess.TimeoutExpired:
-                error_info = "Time out"
-                os.killpg(process.pid, signal.SIGKILL)
-                # log_with_time(f"[INFO TIMEOUT] {case_path}: Process group {process.pid} has been killed.")
+            except asyncio.CancelledError:
+                if steady_stop_time is not None:
+                    self.restore_control_dict(case_path, control_dict_content)
+                # 运行被取消（例如整个流程被停止）时不留下孤儿求解器进程
+                self.kill_process_group(process)
+                wait_task.cancel()
+                log_with_time(f"[INFO CANCELLED] {case_path}: Process group {process.pid} has been killed.")
+                raise
+
+        if error_info.startswith("Divergence"):
+            log_with_time(f"[INFO DIVERGENCE] {case_path}: {error_info}")
+            return 'divergence'
 
         if error_info != "":
             # log_path = glob.glob(os.path.join(case_path, 'log.*Foam'))[0]
@@ -155,9 +329,10 @@ class RunnerAction(Action):
                 log_path = glob.glob(os.path.join(case_path, 'log.*Foam'))[0]
             else:
                 log_path = glob.glob(os.path.join(case_path, 'log.*'))[0]
-            with open(log_path, 'r') as f:
-                log_content = f.read()
-            if 'FOAM FATAL IO ERROR' in log_content or 'FOAM FATAL ERROR' in log_content:
+            # 逐行扫描，不把可能很大的求解器日志整体读入内存
+            with open(log_path, 'r', errors='replace') as f:
+                has_fatal_error = any('FOAM FATAL IO ERROR' in line or 'FOAM FATAL ERROR' in line for line in f)
+            if has_fatal_error:
                 log_with_time(f"[INFO ERROR] {case_path}: {error_info}")
                 return 'error'
             elif "Time out" in error_info:
@@ -171,6 +346,90 @@ class RunnerAction(Action):
             log_with_time(f"[INFO PASS]: {case_path}")
             return 'convergence'
 
+    def setup_parallel_run(self, case_path, allrun_file_path):
+        """
+        根据网格数与可用核数确定子区域数，写入 system/decomposeParDict（scotch），
+        并把 Allrun 中的求解器命令改写为 decomposePar + mpirun -np N + reconstructPar。
+
+        Returns:
+            int: 并行进程数，不并行时为 1。
+        """
+        with open(allrun_file_path, 'r') as f:
+            allrun = f.read()
+        # Allrun 已经自行处理并行时不做修改
+        if re.search(r'\b(decomposePar|runParallel|mpirun)\b', allrun):
+            log_with_time("Allrun already runs in parallel")
+            return 1
+
+        cells = count_cells(case_path)
+        solver = get_solver_name(case_path) if os.path.exists(os.path.join(case_path, 'system', 'controlDict')) else None
+        if not cells or not solver:
+            return 1
+        n_procs = min(config_path.max_procs, cells // config_path.min_cells_per_proc)
+        if n_procs < 2:
+            return 1
+
+        parallel_allrun = self.parallelize_allrun(allrun, solver, n_procs)
+        if parallel_allrun == allrun:
+            log_with_time(f"Solver {solver} not found in Allrun, run in serial")
+            return 1
+        DecomposeParDict.scotch(n_procs).save(os.path.join(case_path, 'system', 'decomposeParDict'))
+        with open(allrun_file_path, 'w') as f:
+            f.write(parallel_allrun)
+        log_with_time(f"run {solver} in parallel with {n_procs} processes ({cells} cells):\n{parallel_allrun}")
+        return n_procs
+
+    @staticmethod
+    def parallelize_allrun(allrun, solver, n_procs):
+        # runApplication <solver> / runApplication $(getApplication) -> RunFunctions 的并行写法
+        run_functions_pattern = re.compile(rf'^([ \t]*)runApplication[ \t]+(?:{re.escape(solver)}|\$\(getApplication\))((?:[ \t].*)?)$', re.MULTILINE)
+        if run_functions_pattern.search(allrun):
+            return run_functions_pattern.sub(
+                lambda m: f"{m.group(1)}runApplication decomposePar -force\n"
+                          f"{m.group(1)}runParallel -np {n_procs} {solver}{m.group(2)}\n"
+                          f"{m.group(1)}runApplication reconstructPar", allrun, count=1)
+        # <solver> [args] [> log.<solver> 2>&1] -> 直接调用 mpirun
+        plain_pattern = re.compile(rf'^([ \t]*){re.escape(solver)}((?:[ \t].*)?)$', re.MULTILINE)
+        return plain_pattern.sub(
+            lambda m: f"{m.group(1)}decomposePar -force > log.decomposePar 2>&1\n"
+                      f"{m.group(1)}mpirun -np {n_procs} {solver} -parallel{m.group(2)}\n"
+                      f"{m.group(1)}reconstructPar > log.reconstructPar 2>&1", allrun, count=1)
+
+    @staticmethod
+    def request_write_now(case_path):
+        # 返回修改前的 controlDict 内容，运行结束后恢复
+        control_dict_path = os.path.join(case_path, 'system', 'controlDict')
+        with open(control_dict_path, 'r') as f:
+            control_dict_content = f.read()
+        set_foam_dict_entry(control_dict_path, 'stopAt', 'writeNow')
+        return control_dict_content
+
+    @staticmethod
+    def restore_control_dict(case_path, control_dict_content):
+        with open(os.path.join(case_path, 'system', 'controlDict'), 'w') as f:
+            f.write(control_dict_content)
+
+    @staticmethod
+    def read_file_tail(file_path, max_bytes=64 * 1024):
+        # 只读取文件末尾，避免把很大的输出整体读入内存
+        with open(file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - max_bytes))
+            return f.read().decode(errors='replace')
+
+    @staticmethod
+    def kill_process_group(process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def remove_lines_with_string(self, file_path, target_string):
+        with open(file_path, 'r') as f:
+            lines = f.readlines()
+        with open(file_path, 'w') as f:
+            f.writelines(line for line in lines if target_string not in line)
+
     def check_foam_errors(self, log_dir):
         error_logs = []
 
@@ -178,23 +437,26 @@ class RunnerAction(Action):
 
         for log_file in log_files:
             log_path = os.path.join(log_dir, log_file)
-            with open(log_path, 'r') as file:
-                lines = file.readlines()
-
             log_with_time(f'log_file:{log_file}')
-            error_indices = None
-            for i, line in enumerate(lines):
-                if ('error' in line.lower() and 'foam' in line.lower()) or 'command not found' in line.lower():
-                    error_indices = i
-                    break
-
-            if error_indices is None:
+            # 只保留报错行之前的 30 行与之后的 60 行，内存占用与日志大小无关
+            before_lines = collections.deque(maxlen=30)
+            error_lines = []
+            with open(log_path, 'r', errors='replace') as file:
+                for line in file:
+                    if error_lines:
+                        if len(error_lines) >= 60:
+                            break
+                        error_lines.append(line)
+                    elif ('error' in line.lower() and 'foam' in line.lower()) or 'command not found' in line.lower():
+                        error_lines.append(line)
+                    else:
+                        before_lines.append(line)
+
+            if not error_lines:
                 continue
 
-            start_index = max(0, error_indices - 30)
-            end_index = min(len(lines), error_indices + 60)
-
-            error_content = [line.strip() for line in lines[start_index:end_index]]
+            lines = list(before_lines) + error_lines
+            error_content = [line.strip() for line in lines]
 
             if error_content:
                 error_logs.append({
@@ -204,6 +466,19 @@ class RunnerAction(Action):
 
         return error_logs
 
+    def resolve_pending_fix(self, run_ctx, error_logs):
+        # 上一次 Corrector 的修正：之前报错的命令本次运行了且日志中没有报错时视为成功，仍报同一个错误时视为失败，记录到错误签名索引中；
+        # 之前的命令（如 blockMesh）报错使该命令没有运行，或该命令报了其他错误时，无法判断修正是否有效，不记录
+        pending_fix, run_ctx.pending_fix = run_ctx.pending_fix, None
+        log_file = f"log.{pending_fix['command']}"
+        if not os.path.exists(os.path.join(run_ctx.case_path, log_file)):
+            return
+        command_errors = [error_log['error_content'] for error_log in error_logs if error_log['file'] == log_file]
+        if command_errors and all(error_signature(error_content) != pending_fix['signature'] for error_content in command_errors):
+            return
+        ErrorFixIndex(config_path.error_index_path).record(pending_fix['signature'], pending_fix['solver'], pending_fix['ops'],
+                                                           success=not command_errors)
+
     def remove_log_files(self, directory):
         log_files = glob.glob(os.path.join(directory, 'log*'))
         for log_file in log_files:
@@ -211,8 +486,8 @@ class RunnerAction(Action):
 
     def extract_commands_from_allrun_out(self, allrun_out_path):
         commands = []
-        with open(allrun_out_path, 'r') as file:
-            lines = file.readlines()
+        with open(allrun_out_path, 'r', errors='replace') as file:
+            lines = [line for line in file if line.startswith('Running ')]
 
         for line in lines:
             if line.startswith('Running '):
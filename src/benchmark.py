@@ -0,0 +1,119 @@
+"""Run several Benchmark cases concurrently and write one consolidated report.
+
+Each case runs in its own worker process (config_path is loaded once per
+interpreter from CONFIG_FILE_PATH), with its case directories under
+run/<tag>/ and its log in run/<tag>/logs/<case_name>.log.
+
+Usage (from the repository root):
+    python src/benchmark.py "Benchmark/*.yaml" --workers 8 --tag benchmark
+"""
+import os
+import sys
+import glob
+import time
+import asyncio
+import argparse
+import datetime
+import traceback
+import multiprocessing
+from contextlib import redirect_stdout, redirect_stderr
+
+Src_PATH = os.path.dirname(os.path.abspath(__file__))
+Base_PATH = os.path.dirname(Src_PATH)
+
+
+def run_case(args):
+    """Run all repetitions of one benchmark case. Executed in a worker process."""
+    config_file, tag, log_dir = args
+    case_name = os.path.splitext(os.path.basename(config_file))[0]
+    os.environ['CONFIG_FILE_PATH'] = config_file
+    os.environ['RUN_PATH'] = tag
+
+    result = {
+        'case_name': case_name,
+        'config_file': config_file,
+        'run_times': 0,
+        'pass_num': 0,
+        'loop': 0,
+        'total_tokens': 0,
+        'running_time': 0,
+        'error': '',
+    }
+    start_time = time.time()
+    log_path = os.path.join(log_dir, f'{case_name}.log')
+    with open(log_path, 'w') as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            if Src_PATH not in sys.path:
+                sys.path.insert(0, Src_PATH)
+            import config_path
+            import main
+            overall_stats = asyncio.run(main.main())
+            result['run_times'] = config_path.run_times
+            result['pass_num'] = overall_stats.pass_num
+            result['loop'] = overall_stats.loop
+            result['total_tokens'] = overall_stats.total_tokens
+        except BaseException as e:
+            # InputWriterAction 解析失败时会 sys.exit(0)，这里同样记为失败
+            traceback.print_exc()
+            result['error'] = f"{type(e).__name__}: {e}"
+    result['running_time'] = time.time() - start_time
+    return result
+
+
+def write_report(results, report_path):
+    results = sorted(results, key=lambda r: r['case_name'])
+    total_runs = sum(r['run_times'] for r in results)
+    total_pass = sum(r['pass_num'] for r in results)
+    with open(report_path, 'w') as f:
+        f.write(f"Date: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Cases: {len(results)}\n")
+        f.write(f"Total Runs: {total_runs}\n")
+        f.write(f"Total Pass Case: {total_pass}\n")
+        f.write(f"Pass Rate: {total_pass / total_runs if total_runs else 0}\n")
+        f.write("\n")
+        f.write(f"{'Case':<32}{'Pass':>8}{'Runs':>8}{'Iterations':>12}{'Total Tokens':>14}{'Time (s)':>12}  Error\n")
+        for r in results:
+            f.write(f"{r['case_name']:<32}{r['pass_num']:>8}{r['run_times']:>8}{r['loop']:>12.2f}"
+                    f"{r['total_tokens']:>14.1f}{r['running_time']:>12.1f}  {r['error']}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Benchmark cases concurrently.")
+    parser.add_argument('patterns', nargs='+', help="glob(s) of Benchmark yaml files, e.g. 'Benchmark/*.yaml'")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="number of cases run at the same time")
+    parser.add_argument('--tag', default=f"benchmark_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                        help="run directory under run/ shared by all cases of this benchmark")
+    args = parser.parse_args()
+
+    config_files = []
+    for pattern in args.patterns:
+        config_files.extend(os.path.abspath(f) for f in glob.glob(pattern))
+    config_files = sorted(set(config_files))
+    if not config_files:
+        parser.error(f"no benchmark yaml matches {args.patterns}")
+
+    bench_dir = os.path.join(Base_PATH, 'run', args.tag)
+    log_dir = os.path.join(bench_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    report_path = os.path.join(bench_dir, 'benchmark_report.txt')
+
+    workers = max(1, min(args.workers, len(config_files)))
+    print(f"Running {len(config_files)} cases with {workers} workers, logs in {log_dir}", flush=True)
+
+    results = []
+    # spawn + maxtasksperchild=1: 每个 case 使用全新的解释器，config_path 等模块级状态互不影响
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(processes=workers, maxtasksperchild=1) as pool:
+        tasks = [(config_file, args.tag, log_dir) for config_file in config_files]
+        for result in pool.imap_unordered(run_case, tasks):
+            results.append(result)
+            status = result['error'] or f"pass {result['pass_num']}/{result['run_times']}"
+            print(f"[{len(results)}/{len(config_files)}] {result['case_name']}: {status} "
+                  f"({result['running_time']:.1f}s)", flush=True)
+            write_report(results, report_path)
+
+    print(f"Report written to {report_path}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
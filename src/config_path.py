@@ -14,7 +14,6 @@ def load_config(file_path):
 # Define paths
 Src_PATH = os.path.dirname(os.path.abspath(__file__))
 Base_PATH = os.path.dirname(Src_PATH)
-Case_PATH = ''
 
 config_file_path = os.getenv('CONFIG_FILE_PATH', '')
 
@@ -26,24 +25,78 @@ config = load_config(config_file_path)
 case_name = os.path.splitext(os.path.basename(config_file_path))[0]
 description = config.get('description', '')
 postProcess_description = config.get('postProcess_description', '')
-mesh_path = config.get('mesh_path', '')
+# mesh_path 中的相对路径以仓库根目录为基准，统一转成绝对路径，避免依赖进程的当前工作目录
+mesh_path = ';'.join(p if os.path.isabs(p) else os.path.join(Base_PATH, p)
+                     for p in config.get('mesh_path', '').split(';') if p)
 runfile_path = config.get('runfile_path', '')
 input_file_list = config.get('input_file_list', '')
 usr_requirment = description + "<mesh_path>" + mesh_path
 max_loop = config.get('max_loop', 10)
 temperature = config.get('temperature', 0.7)
 run_times = config.get('run_times', 1)
+run_concurrency = config.get('run_concurrency', 1)  # number of run_times repetitions run at the same time (in one event loop)
 MetaGPT_PATH = config.get('MetaGPT_PATH', '')
 model = config.get('model', '')
 openfoam_llm = config.get('openfoam_llm', '')
 openfoam_llm_base_url = config.get('openfoam_llm_base_url', '')
-Run_PATH = f'{Base_PATH}/run/' + config.get('run_path', '')  # Modify to the actual path
-should_stop = False
+# 运行时日志监控：满足任一条件即提前终止求解并判为 divergence
+monitor_interval = float(config.get('monitor_interval', 5))  # seconds between two polls of log.*Foam
+max_courant = float(config.get('max_courant', 100))
+max_residual = float(config.get('max_residual', 1e3))
+max_continuity_error = float(config.get('max_continuity_error', 1.0))
+# 稳态求解器（simpleFoam 等）残差进入平台后提前结束（stopAt writeNow），记为 convergence
+steady_stop = config.get('steady_stop', False)
+steady_tolerance = float(config.get('steady_tolerance', 1e-4))
+steady_window = int(config.get('steady_window', 50))  # iterations
+steady_plateau = float(config.get('steady_plateau', 0.1))
+# 运行超时由代价模型（网格数 x 时间步数 x 求解器单位耗时）估计：timeout = timeout_safety_factor x 估计耗时
+cost_model_path = config.get('cost_model_path', f'{Base_PATH}/run/cost_model.json')
+timeout_safety_factor = float(config.get('timeout_safety_factor', 5))
+min_timeout = float(config.get('min_timeout', 600))  # seconds
+max_timeout = float(config.get('max_timeout', 12 * 60 * 60))  # seconds
+mesh_time_allowance = float(config.get('mesh_time_allowance', 600))  # seconds added to the timeout when Allrun generates the mesh
+# MPI 并行运行：根据网格数与可用核数自动生成 decomposeParDict，并把求解器改为 decomposePar + mpirun + reconstructPar
+parallel = config.get('parallel', False)
+max_procs = int(config.get('max_procs', 0)) or os.cpu_count()
+min_cells_per_proc = int(config.get('min_cells_per_proc', 10000))
+# 试运行：完整运行前先在克隆的 case 中只运行 smoke_steps 个时间步（迭代步），0 表示不试运行
+smoke_steps = int(config.get('smoke_steps', 0))
+# 粗网格试运行：blockMeshDict 各方向的划分数除以 coarse_factor 后试运行，1 表示不粗化
+coarse_factor = float(config.get('coarse_factor', 1))
+# 网格缓存：以 blockMeshDict 与 OpenFOAM 版本的哈希为键缓存 blockMesh 生成的 polyMesh
+mesh_cache = bool(config.get('mesh_cache', False))
+mesh_cache_path = config.get('mesh_cache_path', f'{Base_PATH}/run/.mesh_cache')
+# 发散修正后从发散前最后写出的时间步继续计算，而不是从初始时间步重新计算
+restart_on_divergence = bool(config.get('restart_on_divergence', False))
+# 发散时先应用确定性修正规则，没有适用的规则时才调用 LLM
+divergence_rules = bool(config.get('divergence_rules', True))
+# 报错时先查错误签名索引（内置的常见错误修正与学习到的修正），命中时不调用 LLM
+error_index = bool(config.get('error_index', True))
+error_index_path = config.get('error_index_path', f'{Base_PATH}/run/error_index.json')
+# 投机修正：报错时同时生成并试运行的候选修正数，第一个通过试运行的候选胜出，1 表示不使用
+speculative_corrections = int(config.get('speculative_corrections', 1))
+# 报错涉及多个文件时并发重写（每个请求只返回一个文件，再合并），而不是逐个重写
+concurrent_rewrite = bool(config.get('concurrent_rewrite', False))
+# 通用 LLM（OpenAI 接口）客户端的连接池：最大连接数、最大空闲保活连接数、空闲连接保活时间（秒）
+llm_max_connections = int(config.get('llm_max_connections', 100))
+llm_max_keepalive_connections = int(config.get('llm_max_keepalive_connections', 20))
+llm_keepalive_expiry = float(config.get('llm_keepalive_expiry', 30))
+# OpenFOAM LLM 的异步客户端：同时进行的最大请求数（也是连接池大小）、读取超时与连接超时（秒）
+openfoam_llm_concurrency = int(config.get('openfoam_llm_concurrency', 32))
+openfoam_llm_timeout = float(config.get('openfoam_llm_timeout', 600))
+openfoam_llm_connect_timeout = float(config.get('openfoam_llm_connect_timeout', 10))
+# LLM 回复缓存（sqlite）：最多保存的回复数（0 不限制）、有效时间（秒，0 不过期）
+llm_cache = bool(config.get('llm_cache', False))
+llm_cache_path = config.get('llm_cache_path', f'{Base_PATH}/run/llm_cache.sqlite')
+llm_cache_max_entries = int(config.get('llm_cache_max_entries', 10000))
+llm_cache_ttl = float(config.get('llm_cache_ttl', 0))
+# 记录每次 LLM 请求与回复的 jsonl 文件，供 llm_server.py 回放；为空时不记录
+llm_record_path = config.get('llm_record_path', '')
+# OpenFOAM LLM 流式生成：InputWriter 边生成边校验 Foam Files，无效时立即中止并重新生成
+openfoam_llm_stream = bool(config.get('openfoam_llm_stream', False))
+# RUN_PATH (set by benchmark.py) overrides run_path so that concurrent cases get their own run directory
+Run_PATH = f'{Base_PATH}/run/' + os.getenv('RUN_PATH', config.get('run_path', ''))  # Modify to the actual path
 postprocess_should_stop = False
-status = ''
-
-writter_prompt = ''
-writter_system = ''
 
 # Set environment variables from config
 os.environ["API_KEY"] = config.get("API_KEY", "")
@@ -84,7 +137,10 @@ new_config2_data = {
 }
 
 # Write the modified config back to config2.yaml
-with open(config2_yaml_path, 'w') as file:
+# 先写临时文件再替换，避免并发运行的多个 case 读到写了一半的 config2.yaml
+tmp_config2_yaml_path = f"{config2_yaml_path}.{os.getpid()}.tmp"
+with open(tmp_config2_yaml_path, 'w') as file:
     yaml.dump(new_config2_data, file, default_flow_style=False)
+os.replace(tmp_config2_yaml_path, config2_yaml_path)
 
 log_with_time(f"{config2_yaml_path} has been updated successfully.")
\ No newline at end of file
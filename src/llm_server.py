@@ -0,0 +1,146 @@
+"""Local stand-in LLM server replaying recorded requests, for offline and reproducible benchmarks.
+
+Serves an OpenAI-compatible chat.completions endpoint on every POST path, so
+it can be used both as BASE_URL (http://127.0.0.1:<port>/v1) and as
+openfoam_llm_base_url (http://127.0.0.1:<port>/v1/chat/completions).
+Responses come from the jsonl files written with llm_record_path; requests
+that were never recorded get a 404. Requests with "stream": true get the
+response as server-sent events, with the latency spread over the chunks.
+
+Usage (from the repository root):
+    python src/llm_server.py run/llm_records.jsonl --port 8000 --latency recorded
+"""
+import sys
+import json
+import time
+import argparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.llm_replay import ReplayIndex
+
+# 流式回放时每段的字符数
+STREAM_CHUNK = 16
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头与响应体分两次写出，关闭 Nagle 算法避免每个请求多等一个 delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            messages = body.get('messages', [])
+            system_msg = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+            prompt = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {'error': {'message': f"invalid request: {e}", 'type': 'invalid_request_error'}})
+            return
+
+        record = self.server.index.lookup(body.get('model'), body.get('temperature'), system_msg, prompt)
+        if record is None:
+            self.server.misses += 1
+            self.send_json(404, {'error': {'message': "request was not recorded", 'type': 'not_found_error'}})
+            return
+        self.server.hits += 1
+        latency = (record.get('latency') or 0) if self.server.latency is None else self.server.latency
+        if body.get('stream'):
+            self.send_stream(record, latency, body)
+            return
+        time.sleep(latency)
+        self.send_json(200, {
+            'id': f"chatcmpl-replay-{self.server.hits}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': record['response']},
+                'finish_reason': 'stop',
+            }],
+            'usage': record.get('usage') or {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+        })
+
+    def send_stream(self, record, latency, body):
+        # 按 STREAM_CHUNK 个字符一段以 SSE 流式返回，延迟均匀分配到各段，客户端中途断开即中止
+        response = record['response']
+        pieces = [response[i:i + STREAM_CHUNK] for i in range(0, len(response), STREAM_CHUNK)] or ['']
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        chunk = {'id': f"chatcmpl-replay-{self.server.hits}", 'object': 'chat.completion.chunk',
+                 'created': int(time.time()), 'model': body.get('model')}
+        events = [dict(chunk, choices=[{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]) for piece in pieces]
+        events[-1]['choices'][0]['finish_reason'] = 'stop'
+        if (body.get('stream_options') or {}).get('include_usage'):
+            events.append(dict(chunk, choices=[], usage=record.get('usage')))
+        try:
+            for event in events:
+                time.sleep(latency / len(pieces) if event.get('choices') else 0)
+                self.write_chunk(f"data: {json.dumps(event)}\n\n")
+            self.write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.aborted += 1
+            self.close_connection = True
+
+    def write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def send_json(self, status, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def make_server(index, host='127.0.0.1', port=8000, latency=None, verbose=False):
+    """
+    Args:
+        index (ReplayIndex): 回放的记录。
+        latency (float): 每个请求的固定延迟（秒），为 None 时使用记录中的耗时。
+    """
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.daemon_threads = True
+    server.index = index
+    server.latency = latency
+    server.verbose = verbose
+    server.hits = 0
+    server.misses = 0
+    server.aborted = 0
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded LLM requests as a local OpenAI-compatible server.")
+    parser.add_argument('records', nargs='+', help="jsonl files written with llm_record_path")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', default='recorded',
+                        help="'recorded' to sleep for the recorded latency, or a fixed latency in seconds (0 for none)")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    latency = None if args.latency == 'recorded' else float(args.latency)
+    index = ReplayIndex.load(args.records)
+    server = make_server(index, args.host, args.port, latency, args.verbose)
+    print(f"Replaying {len(index)} recorded responses on http://{args.host}:{server.server_port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"{server.hits} replayed ({server.aborted} aborted by the client), {server.misses} not recorded", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,80 @@
-
 import asyncio
+import traceback
 
 from metagpt.config2 import Config
 from metagpt.context import Context
 from metagpt.schema import Message
 from metagpt.environment.base_env import Environment
 
-from qa_module import AsyncQA_Ori, AsyncQA_OpenFOAM_LLM
 from roles.Prechecker import Prechecker
 from roles.InputWriter import InputWriter
 from roles.Corrector import Corrector
 from roles.Runner import Runner
 import config_path
-from Statistics import Statistics, global_statistics
+from Statistics import Statistics
+from run_context import RunContext
+from qa_module import close_openfoam_llm_client
 import time
 from utils.util import log_with_time
 
 async def main():
     overall_stats = Statistics()
-    for _ in range(config_path.run_times):
-        global_statistics.reset()
-        start_time = time.time()
-        global_statistics.runtimes = _ + 1
-        log_with_time(f"runtimes: {_ + 1}")
-        config_path.should_stop = False
-        await run_instance()
+    runtimes_list = list(range(1, config_path.run_times + 1))
+    # 每个 repetition 有独立的 RunContext，可以在同一个事件循环中并发运行
+    semaphore = asyncio.Semaphore(max(1, config_path.run_concurrency))
+    log_with_time(f"run {config_path.run_times} repetitions with concurrency {config_path.run_concurrency}")
+    try:
+        # 某个 repetition 出错时其他 repetition 照常完成并统计
+        results = await asyncio.gather(*[run_repetition(runtimes, semaphore) for runtimes in runtimes_list],
+                                       return_exceptions=True)
+    finally:
+        await close_openfoam_llm_client()
+    for runtimes, result in zip(runtimes_list, results):
+        if isinstance(result, BaseException):
+            log_with_time(f"runtimes {runtimes} failed: {result!r}")
+    results = [result for result in results if not isinstance(result, BaseException)]
 
-        global_statistics.running_time = time.time() - start_time
-        if global_statistics.Executability == 3:
+    for run_ctx in results:
+        if run_ctx.statistics.Executability == 3:
             overall_stats.pass_num += 1
-        global_statistics.save_to_file(config_path.Case_PATH)
-        overall_stats.save(global_statistics)
+        overall_stats.save(run_ctx.statistics)
 
     overall_stats.average(config_path.run_times)
     overall_stats.display()
-    overall_stats.save_ave_file(config_path.Case_PATH)
+    overall_stats.save_ave_file(results[-1].case_path if results else f"{config_path.Run_PATH}/{config_path.case_name}")
+    return overall_stats
+
+async def run_repetition(runtimes, semaphore):
+    async with semaphore:
+        start_time = time.time()
+        log_with_time(f"runtimes: {runtimes}")
+        run_ctx = RunContext(runtimes)
+        try:
+            await run_instance(run_ctx)
+        except Exception:
+            # 本次运行出错只记为失败，不取消并发的其他运行
+            log_with_time(f"runtimes {runtimes} failed:\n{traceback.format_exc()}")
+            run_ctx.status = 'error'
+        finally:
+            run_ctx.close()
 
-async def run_instance():
-    async_qa_ori = AsyncQA_Ori()
-    async_qa_ori.init_instance()
-    async_qa_openfoam_llm = AsyncQA_OpenFOAM_LLM()
-    async_qa_openfoam_llm.init_instance()
+        run_ctx.statistics.running_time = time.time() - start_time
+        run_ctx.statistics.save_to_file(run_ctx.case_path, run_ctx.status)
+        return run_ctx
 
+async def run_instance(run_ctx):
     env = Environment()
-    prechecker = Prechecker()
-    writter = InputWriter()
-    runner = Runner()
-    corrector = Corrector()
+    prechecker = Prechecker(run_ctx=run_ctx)
+    writter = InputWriter(run_ctx=run_ctx)
+    runner = Runner(run_ctx=run_ctx)
+    corrector = Corrector(run_ctx=run_ctx)
 
     env.add_roles([prechecker, writter, runner, corrector])
 
     env.publish_message(Message(content=config_path.usr_requirment, send_to=Prechecker))
-    while not env.is_idle and not config_path.should_stop:
+    while not env.is_idle and not run_ctx.should_stop:
         await env.run()
 
 if __name__ == "__main__":
 
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
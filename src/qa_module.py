@@ -1,70 +1,145 @@
 import os
+import json
+import time
 import asyncio
-import requests
+import weakref
+import threading
+import collections
+import httpx
 from concurrent.futures import ThreadPoolExecutor
-from openai import OpenAI
+from openai import OpenAI, DefaultHttpxClient
 
 import config_path
-from Statistics import global_statistics
+from utils.llm_cache import get_llm_cache, request_hash
+from utils.llm_replay import get_llm_recorder
 
+# (base_url, api_key) -> OpenAI 客户端，进程内所有 AsyncQA_Ori 与多次运行共享同一个连接池
+_openai_clients = {}
+_openai_clients_lock = threading.Lock()
+# 事件循环 -> (httpx.AsyncClient, asyncio.Semaphore)，同一事件循环中并发的所有运行共享 OpenFOAM LLM 的连接池与并发上限
+_openfoam_llm_clients = weakref.WeakKeyDictionary()
 
-class AsyncQA_Ori:
 
-    _instance = None
+class CachedQA:
+    """
+    AsyncQA_Ori 与 AsyncQA_OpenFOAM_LLM 共用的 LLM 回复缓存，config_path.llm_cache 打开时生效。
 
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(AsyncQA_Ori, cls).__new__(cls, *args, **kwargs)
-            cls._instance._initialized = False
-        return cls._instance
-    
-    def init_instance(self):
-        if not self._initialized:
-            self.qa_interface = setup_qa_ori()
-            self.executor = ThreadPoolExecutor()
-            self._initialized = True
+    缓存键为请求哈希加上该请求在本次运行中的序号：同一运行中重复发送的相同请求（如解析失败后重新生成）
+    对应不同的缓存项，不会一直得到同一个回复；再次运行时按相同的顺序命中缓存。
+    请求失败或生成被中止（GenerationAborted）时没有写入缓存，其序号交还给下一次相同的请求，
+    接受的回复仍按从 0 开始的序号保存，再次运行时能够命中。
+    temperature 不为 0 的采样请求（OpenFOAM 微调模型使用服务端的默认 temperature，也视为采样）的缓存键还包含 repetition 序号，
+    同一次 benchmark 的各个 repetition 各自采样，不会重放第一个 repetition 的回复；只有 temperature 为 0 的请求在 repetition 之间共享。
 
-    async def ask(self, question, system_msg=""):
-        loop = asyncio.get_running_loop()
+    Args:
+        statistics (Statistics): 记录命中与未命中次数。
+        runtimes (int): 当前是第几次 repetition。
+    """
 
-        result = await loop.run_in_executor(self.executor, self.qa_interface, question, system_msg)
-        return result
+    def __init__(self, statistics, runtimes=1):
+        self.statistics = statistics
+        self.runtimes = runtimes
+        self.cache = get_llm_cache(config_path.llm_cache_path, config_path.llm_cache_max_entries,
+                                   config_path.llm_cache_ttl) if config_path.llm_cache else None
+        self.occurrences = collections.Counter()
+        # digest -> 请求失败后交还的序号
+        self.released = collections.defaultdict(list)
 
-    def close(self):
-        self.executor.shutdown()
+    async def cached_ask(self, model, temperature, question, system_msg, ask):
+        """
+        Args:
+            ask (callable): 未命中时调用，返回 LLM 回复的协程函数。
 
-class AsyncQA_OpenFOAM_LLM:
+        Returns:
+            str: 缓存的或新生成的回复。
+        """
+        if self.cache is None:
+            return await ask()
+        digest = request_hash(model, temperature, system_msg, question)
+        sampled = temperature is None or float(temperature) != 0
+        if self.released[digest]:
+            occurrence = min(self.released[digest])
+            self.released[digest].remove(occurrence)
+        else:
+            occurrence = self.occurrences[digest]
+            self.occurrences[digest] += 1
+        key = f"{digest}:{self.runtimes}:{occurrence}" if sampled else f"{digest}:{occurrence}"
+        result = self.cache.get(key)
+        if result is not None:
+            self.statistics.llm_cache_hits += 1
+            return result
+        self.statistics.llm_cache_misses += 1
+        try:
+            result = await ask()
+        finally:
+            if result is None:
+                self.released[digest].append(occurrence)
+        self.cache.put(key, result)
+        return result
 
-    _instance = None
 
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(AsyncQA_OpenFOAM_LLM, cls).__new__(cls, *args, **kwargs)
-            cls._instance._initialized = False
-        return cls._instance
-    
-    def init_instance(self):
-        if not self._initialized:
-            self.qa_interface = setup_qa_openfoam_llm()
-            self.executor = ThreadPoolExecutor()
-            self._initialized = True
+class AsyncQA_Ori(CachedQA):
 
-    async def ask(self, question, system_msg=""):
+    def __init__(self, statistics, runtimes=1):
+        super().__init__(statistics, runtimes)
+        # token 计入调用方（RunContext）的 statistics，不同运行之间互不影响
+        self.qa_interface = setup_qa_ori(statistics)
+        self.executor = ThreadPoolExecutor()
+
+    async def ask(self, question, system_msg="", temperature=None):
+        # temperature 为 None 时使用配置中的 temperature
         loop = asyncio.get_running_loop()
+        temperature = config_path.temperature if temperature is None else temperature
 
-        result = await loop.run_in_executor(self.executor, self.qa_interface, question, system_msg)
-        return result
+        async def ask():
+            return await loop.run_in_executor(self.executor, self.qa_interface, question, system_msg, temperature)
+
+        model = f"{os.environ.get('BASE_URL')}/{config_path.model}"
+        return await self.cached_ask(model, temperature, question, system_msg, ask)
 
     def close(self):
         self.executor.shutdown()
 
-def setup_qa_ori():
+class AsyncQA_OpenFOAM_LLM(CachedQA):
 
-    def get_qwen_response(user_msg, system_msg=""):
+    def __init__(self, statistics, runtimes=1):
+        super().__init__(statistics, runtimes)
+        # token 计入调用方（RunContext）的 statistics，不同运行之间互不影响
+        self.qa_interface = setup_qa_openfoam_llm(statistics)
 
-        client = OpenAI(api_key=os.environ.get("API_KEY"),
-                        base_url=os.environ["BASE_URL"],
-        )
+    async def ask(self, question, system_msg="", validate=None):
+        # validate: 流式生成时校验增量内容，报 ValueError 时中止生成并抛出 GenerationAborted（不写入缓存）
+        async def ask():
+            return await self.qa_interface(question, system_msg, validate)
+
+        return await self.cached_ask(config_path.openfoam_llm_base_url, None, question, system_msg, ask)
+
+    def close(self):
+        # 连接池由同一事件循环中的所有运行共享，由 close_openfoam_llm_client 关闭
+        pass
+
+def get_openai_client(base_url, api_key):
+    """
+    返回 (base_url, api_key) 对应的长期复用的 OpenAI 客户端，避免每次调用都新建连接池、重新握手。
+    OpenAI 客户端（httpx.Client）是线程安全的，可以在 AsyncQA_Ori 的线程池中共享。
+    """
+    key = (base_url, api_key)
+    with _openai_clients_lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            limits = httpx.Limits(max_connections=config_path.llm_max_connections,
+                                  max_keepalive_connections=config_path.llm_max_keepalive_connections,
+                                  keepalive_expiry=config_path.llm_keepalive_expiry)
+            client = OpenAI(api_key=api_key, base_url=base_url, http_client=DefaultHttpxClient(limits=limits))
+            _openai_clients[key] = client
+    return client
+
+
+def setup_qa_ori(statistics):
+
+    def get_qwen_response(user_msg, system_msg="", temperature=None):
+
+        client = get_openai_client(os.environ["BASE_URL"], os.environ.get("API_KEY"))
         if system_msg == "":
             messages=[
                 {
@@ -83,11 +158,14 @@ def setup_qa_ori():
                     "content": user_msg
                 }
             ]
+        temperature = config_path.temperature if temperature is None else temperature
+        start_time = time.time()
         chat_completion = client.chat.completions.create(
             messages=messages,
             model=config_path.model,
-            temperature=config_path.temperature
+            temperature=temperature
         )
+        latency = time.time() - start_time
         chat_completion_dict = dict(chat_completion)
         # print(chat_completion_dict.keys())
         usage = chat_completion_dict['usage']
@@ -96,17 +174,87 @@ def setup_qa_ori():
         prompt_tokens = usage['prompt_tokens']
         completion_tokens = usage['completion_tokens']
 
-        global_statistics.total_tokens += total_tokens
-        global_statistics.prompt_tokens += prompt_tokens
-        global_statistics.completion_tokens += completion_tokens
+        statistics.total_tokens += total_tokens
+        statistics.prompt_tokens += prompt_tokens
+        statistics.completion_tokens += completion_tokens
 
-        return chat_completion.choices[0].message.content
+        content = chat_completion.choices[0].message.content
+        if config_path.llm_record_path:
+            tokens = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens, 'total_tokens': total_tokens}
+            get_llm_recorder(config_path.llm_record_path).record(config_path.model, temperature, system_msg, user_msg, content, tokens, latency)
+        return content
 
     return get_qwen_response
     
 
-def setup_qa_openfoam_llm():
-    def get_openfoam_llm_response(user_msg, system_msg=""):
+def get_openfoam_llm_client():
+    """
+    返回当前事件循环共享的 OpenFOAM LLM 异步客户端（HTTP keep-alive 连接池）与限制同时进行的请求数的信号量。
+    httpx.AsyncClient 与 asyncio.Semaphore 都绑定在事件循环上，因此按事件循环分别创建。
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _openfoam_llm_clients:
+        concurrency = max(1, config_path.openfoam_llm_concurrency)
+        limits = httpx.Limits(max_connections=concurrency,
+                              max_keepalive_connections=concurrency,
+                              keepalive_expiry=config_path.llm_keepalive_expiry)
+        timeout = httpx.Timeout(config_path.openfoam_llm_timeout, connect=config_path.openfoam_llm_connect_timeout)
+        _openfoam_llm_clients[loop] = (httpx.AsyncClient(limits=limits, timeout=timeout), asyncio.Semaphore(concurrency))
+    return _openfoam_llm_clients[loop]
+
+
+async def close_openfoam_llm_client():
+    """关闭当前事件循环共享的 OpenFOAM LLM 客户端。"""
+    client_semaphore = _openfoam_llm_clients.pop(asyncio.get_running_loop(), None)
+    if client_semaphore is not None:
+        await client_semaphore[0].aclose()
+
+
+class GenerationAborted(Exception):
+    """流式生成的内容被判定无效，已中止生成。"""
+
+
+async def stream_chat_completion(client, url, headers, data, validate=None):
+    """
+    流式请求 chat.completions，把每段增量内容交给 validate 校验；validate 报错时立即关闭连接，服务端随之中止生成。
+
+    Returns:
+        (int, dict | str): 状态码与拼接成非流式格式的回复；状态码不是 200 时为错误信息。
+
+    Raises:
+        GenerationAborted: validate 判定生成的内容无效。
+    """
+    data = dict(data, stream=True, stream_options={'include_usage': True})
+    content = []
+    usage = None
+    async with client.stream('POST', url, headers=headers, json=data) as response:
+        if response.status_code != 200:
+            return response.status_code, (await response.aread()).decode(errors='replace')
+        async for line in response.aiter_lines():
+            if not line.startswith('data:'):
+                continue
+            payload = line[len('data:'):].strip()
+            if payload == '[DONE]':
+                break
+            chunk = json.loads(payload)
+            usage = chunk.get('usage') or usage
+            for choice in chunk.get('choices') or []:
+                delta = (choice.get('delta') or {}).get('content')
+                if not delta:
+                    continue
+                content.append(delta)
+                if validate is not None:
+                    try:
+                        validate(delta)
+                    except ValueError as e:
+                        raise GenerationAborted(f"{e} (after {len(''.join(content))} characters)") from e
+    # 服务端不支持 stream_options 时没有 token 用量
+    usage = usage or {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+    return 200, {'choices': [{'message': {'content': ''.join(content)}}], 'usage': usage}
+
+
+def setup_qa_openfoam_llm(statistics):
+    async def get_openfoam_llm_response(user_msg, system_msg="", validate=None):
         base_url = config_path.openfoam_llm_base_url
         
         headers = {
@@ -130,23 +278,43 @@ def setup_qa_openfoam_llm():
             "content": user_msg
         })
 
-        response = requests.post(base_url, headers=headers, json=data)
-        if response.status_code == 200:
-            chat_completion = response.json()
+        client, semaphore = get_openfoam_llm_client()
+        try:
+            async with semaphore:
+                start_time = time.time()
+                if config_path.openfoam_llm_stream:
+                    status_code, chat_completion = await stream_chat_completion(client, base_url, headers, data, validate)
+                else:
+                    response = await client.post(base_url, headers=headers, json=data)
+                    status_code = response.status_code
+                    chat_completion = response.json() if status_code == 200 else response.text
+                latency = time.time() - start_time
+        except httpx.TimeoutException as e:
+            print(f"Failed to get response: timeout {e!r}")
+            return None
+        except GenerationAborted as e:
+            # 与请求失败区分开，由调用方决定是否重新生成
+            print(f"Generation aborted after {time.time() - start_time:.1f}s: {e}")
+            raise
 
+        if status_code == 200:
             usage = chat_completion['usage']
             usage = dict(usage)
             total_tokens = usage['total_tokens']
             prompt_tokens = usage['prompt_tokens']
             completion_tokens = usage['completion_tokens']
-            global_statistics.total_tokens += total_tokens
-            global_statistics.prompt_tokens += prompt_tokens
-            global_statistics.completion_tokens += completion_tokens
+            statistics.total_tokens += total_tokens
+            statistics.prompt_tokens += prompt_tokens
+            statistics.completion_tokens += completion_tokens
 
-            return chat_completion['choices'][0]['message']['content']
+            content = chat_completion['choices'][0]['message']['content']
+            if config_path.llm_record_path:
+                tokens = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens, 'total_tokens': total_tokens}
+                get_llm_recorder(config_path.llm_record_path).record(data['model'], None, system_msg, user_msg, content, tokens, latency)
+            return content
         
         else:
-            print(f"Failed to get response: {response.status_code} {response.text}")
+            print(f"Failed to get response: {status_code} {chat_completion}")
             return None
 
-    return get_openfoam_llm_response
\ No newline at end of file
+    return get_openfoam_llm_response
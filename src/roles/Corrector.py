@@ -1,5 +1,8 @@
 
 
+from typing import Any
+
+from pydantic import Field
 from metagpt.roles.role import Role
 from metagpt.schema import Message
 from metagpt.logs import logger
@@ -12,6 +15,8 @@ from utils.util import log_with_time
 class Corrector(Role):
     name: str = "Carol"
     profile: str = "Corrector"
+    # 本次运行的 RunContext，由 run_instance 创建并传入
+    run_ctx: Any = Field(default=None, exclude=True)
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
         self.set_actions([CorrectorAction])
@@ -24,7 +29,7 @@ class Corrector(Role):
 
         context_all = self.get_memories()
         log_with_time(f'Corrector input:\n{context_all}')
-        rewrite_inputfiles = await todo.run(context_all)
+        rewrite_inputfiles = await todo.run(context_all, run_ctx=self.run_ctx)
         log_with_time(f'Corrector output:\n{rewrite_inputfiles}')
 
         msg = Message(content=rewrite_inputfiles, role=self.profile, cause_by=type(todo))
@@ -1,5 +1,8 @@
 
 
+from typing import Any
+
+from pydantic import Field
 from metagpt.roles.role import Role
 from metagpt.schema import Message
 
@@ -13,6 +16,8 @@ from utils.util import log_with_time
 class InputWriter(Role):
     name: str = "Bob"
     profile: str = "InputWriter"
+    # 本次运行的 RunContext，由 run_instance 创建并传入
+    run_ctx: Any = Field(default=None, exclude=True)
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -24,7 +29,7 @@ class InputWriter(Role):
         todo = self.rc.todo
         
         log_with_time(f'InputWriter input: {self.rc.history}')
-        code_text = await todo.run(self.rc.history)
+        code_text = await todo.run(self.rc.history, run_ctx=self.run_ctx)
 
         msg = Message(content=code_text, role=self.profile, cause_by=type(todo))
         return msg
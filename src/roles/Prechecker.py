@@ -1,5 +1,8 @@
 
 
+from typing import Any
+
+from pydantic import Field
 from metagpt.roles.role import Role
 from metagpt.schema import Message
 
@@ -12,6 +15,8 @@ from utils.util import log_with_time
 class Prechecker(Role):
     name: str = "Alice"
     profile: str = "Prechecker"
+    # 本次运行的 RunContext，由 run_instance 创建并传入
+    run_ctx: Any = Field(default=None, exclude=True)
 
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -23,7 +28,7 @@ class Prechecker(Role):
         todo = self.rc.todo
         
         log_with_time(f'Prechecker input: {self.rc.history}')
-        prompt = await todo.run(self.rc.history)
+        prompt = await todo.run(self.rc.history, run_ctx=self.run_ctx)
 
         msg = Message(content=prompt, role=self.profile, cause_by=type(todo))
         return msg
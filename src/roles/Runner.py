@@ -1,5 +1,8 @@
 
 
+from typing import Any
+
+from pydantic import Field
 from metagpt.roles.role import Role
 from metagpt.schema import Message
 from metagpt.logs import logger
@@ -12,6 +15,8 @@ from utils.util import log_with_time
 class Runner(Role):
     name: str = "Foamer"
     profile: str = "Runner"
+    # 本次运行的 RunContext，由 run_instance 创建并传入
+    run_ctx: Any = Field(default=None, exclude=True)
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
         # Initialize actions specific to the Architect role
@@ -24,7 +29,7 @@ class Runner(Role):
 
         context = self.get_memories()
         log_with_time(f"Runner input:{context}")
-        msg = await todo.run(context)
+        msg = await todo.run(context, run_ctx=self.run_ctx)
         log_with_time(f"Runner output:{msg}")
         
         msg = Message(content=msg, role=self.profile, cause_by=type(todo))
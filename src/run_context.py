@@ -0,0 +1,51 @@
+import config_path
+from Statistics import Statistics
+from qa_module import AsyncQA_Ori, AsyncQA_OpenFOAM_LLM
+
+
+class RunContext:
+    """
+    一次 Prechecker -> InputWriter -> Runner -> Corrector 流程的运行状态。
+
+    每次 run_instance 创建一个 RunContext，并传给所有 role 和 action，
+    因此同一个进程/事件循环中可以同时运行多个流程。
+
+    Attributes:
+        runtimes (int): 当前是第几次 repetition（从 1 开始）。
+        case_name (str): 算例名称。
+        case_path (str): 本次运行的算例目录（绝对路径）。
+        description (str): 经过 Prechecker 补充后的问题描述。
+        should_stop (bool): 是否结束本次运行。
+        status (str): 最近一次 Runner 的运行结果（convergence/divergence/error/timeout），InputWriter 解析失败或运行出错时为 error。
+        divergence (dict): 运行中监控到发散时的 {'file', 'time', 'reason'}，否则为 None。
+        pending_fix (dict): Corrector 最近一次对报错的修正 {'signature', 'solver', 'ops', 'source', 'command'}，由下一次 Runner 根据 command 的日志判断是否成功。
+        writter_prompt (str): InputWriter 使用的 prompt。
+        writter_system (str): InputWriter 使用的 system prompt。
+        statistics (Statistics): 本次运行的迭代次数与 token 统计。
+        qa_ori (AsyncQA_Ori): 通用 LLM 客户端。
+        qa_openfoam_llm (AsyncQA_OpenFOAM_LLM): OpenFOAM 微调模型客户端。
+    """
+
+    def __init__(self, runtimes=1):
+        self.runtimes = runtimes
+        self.case_name = config_path.case_name
+        if config_path.run_times > 1:
+            self.case_path = f"{config_path.Run_PATH}/{self.case_name}_{runtimes}"
+        else:
+            self.case_path = f"{config_path.Run_PATH}/{self.case_name}"
+        self.description = config_path.description
+        self.should_stop = False
+        self.status = ''
+        self.divergence = None
+        self.pending_fix = None
+        self.writter_prompt = ''
+        self.writter_system = ''
+
+        self.statistics = Statistics()
+        self.statistics.runtimes = runtimes
+        self.qa_ori = AsyncQA_Ori(self.statistics, runtimes)
+        self.qa_openfoam_llm = AsyncQA_OpenFOAM_LLM(self.statistics, runtimes)
+
+    def close(self):
+        self.qa_ori.close()
+        self.qa_openfoam_llm.close()
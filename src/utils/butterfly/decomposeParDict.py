@@ -3,7 +3,7 @@
 
 Decompose parameters for parallel runs.
 """
-from foamfile import FoamFile, foam_file_from_file
+from .foamfile import FoamFile, foam_file_from_file
 from collections import OrderedDict
 
 
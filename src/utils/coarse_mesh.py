@@ -0,0 +1,61 @@
+import re
+
+from utils.cost_model import BLOCK_PATTERN, VARIABLE_PATTERN
+
+
+def coarsen_divisions(content, factor):
+    """
+    将 blockMeshDict 内容中每个 block 各方向的划分数除以 factor（至少为 1），其余内容（grading、边界、曲边等）保持不变。
+    划分数为 $var / $:dict.var 时缩放对应的数字常量定义，相同的划分数缩放后仍相同，相邻 block 的公共面保持一致。
+
+    Args:
+        content (str): blockMeshDict 的内容。
+        factor (float): 每个方向的缩放因子，三维网格的网格数约减少 factor^3 倍。
+
+    Returns:
+        str: 缩放后的内容；存在无法解析的划分数（如 #eval、#calc）时返回 None。
+    """
+    def scale(value):
+        return str(max(1, int(round(int(value) / factor))))
+
+    variables = {name for name, _ in VARIABLE_PATTERN.findall(content)}
+    scaled_variables = set()
+    for block in BLOCK_PATTERN.findall(content):
+        for division in block[1:]:
+            if division.isdigit():
+                continue
+            name = division.lstrip('$:').split('.')[-1]
+            if name not in variables:
+                return None
+            scaled_variables.add(name)
+
+    def replace_block(match):
+        text = match.group(0)
+        start = match.start(0)
+        # 只替换三个划分数，从后往前替换保证前面的位置不变
+        for index in (4, 3, 2):
+            if match.group(index).isdigit():
+                text = text[:match.start(index) - start] + scale(match.group(index)) + text[match.end(index) - start:]
+        return text
+
+    content = BLOCK_PATTERN.sub(replace_block, content)
+    for name in scaled_variables:
+        pattern = re.compile(r'^(\s*' + re.escape(name) + r'\s+)(\d+)(\s*;)', re.MULTILINE)
+        content = pattern.sub(lambda m: m.group(1) + scale(m.group(2)) + m.group(3), content)
+    return content
+
+
+def coarsen_block_mesh_dict(block_mesh_dict_path, factor):
+    """
+    原地缩放 blockMeshDict 文件中的划分数。
+
+    Returns:
+        bool: 是否成功缩放。
+    """
+    with open(block_mesh_dict_path, 'r') as f:
+        content = coarsen_divisions(f.read(), factor)
+    if content is None:
+        return False
+    with open(block_mesh_dict_path, 'w') as f:
+        f.write(content)
+    return True
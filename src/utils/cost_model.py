@@ -0,0 +1,227 @@
+import os
+import re
+import json
+
+from utils.util import log_with_time, get_foam_dict_entry, get_solver_name
+from utils.mesh_cache import MESH_COMMAND_PATTERN
+
+# 没有历史数据时使用的每网格每时间步耗时（秒）
+DEFAULT_CELL_STEP_COST = 5e-6
+# 新的标定结果在滑动平均中的权重
+CALIBRATION_WEIGHT = 0.3
+
+# hex (v0 ... v7) [zoneName] (nx ny nz)，划分数可以是数字或 $var / $:dict.var
+DIVISION = r'(\$?:?[\w.]+)'
+BLOCK_PATTERN = re.compile(r'hex\s*\(([\d\s]+)\)\s*(?:\w+\s*)?\(\s*' + DIVISION + r'\s+' + DIVISION + r'\s+' + DIVISION + r'\s*\)')
+VARIABLE_PATTERN = re.compile(r'^\s*(\w+)\s+(-?[\d.]+(?:[eE][-+]?\d+)?)\s*;', re.MULTILINE)
+NCELLS_PATTERN = re.compile(r'nCells:\s*(\d+)')
+MESHING_PATTERN = re.compile(r'\bblockMesh\b|' + MESH_COMMAND_PATTERN.pattern)
+
+
+def count_cells(case_path):
+    """
+    估计 case 的网格数：优先读取 constant/polyMesh/owner 头部的 nCells，否则累加 blockMeshDict 中各 block 的划分数。
+
+    Returns:
+        int: 网格数，无法确定时返回 None。
+    """
+    owner_path = os.path.join(case_path, 'constant', 'polyMesh', 'owner')
+    if os.path.exists(owner_path):
+        with open(owner_path, 'r', errors='replace') as f:
+            header = f.read(4096)
+        match = NCELLS_PATTERN.search(header)
+        if match:
+            return int(match.group(1))
+
+    for block_mesh_dict_path in (os.path.join(case_path, 'system', 'blockMeshDict'),
+                                 os.path.join(case_path, 'constant', 'polyMesh', 'blockMeshDict')):
+        if os.path.exists(block_mesh_dict_path):
+            with open(block_mesh_dict_path, 'r') as f:
+                content = re.sub(r'//.*', '', f.read())
+            # 去掉 #if 0 ... #endif 中不生效的定义
+            content = re.sub(r'#if\s+0.*?#endif', '', content, flags=re.DOTALL)
+            divisions = block_divisions(content)
+            if divisions:
+                return sum(nx * ny * nz for nx, ny, nz in divisions)
+    return None
+
+
+def block_divisions(content):
+    """
+    解析 blockMeshDict 内容中每个 block 的 (nx, ny, nz)，支持数字常量定义的 $var 与 $:dict.var。
+
+    Returns:
+        list: 每个 block 的 (nx, ny, nz)，有无法解析的划分数时返回 None。
+    """
+    variables = {name: value for name, value in VARIABLE_PATTERN.findall(content)}
+    divisions = []
+    for block in BLOCK_PATTERN.findall(content):
+        values = []
+        for division in block[1:]:
+            # $:backgroundMesh.lengthCells -> lengthCells, $nx -> nx
+            name = division.lstrip('$:').split('.')[-1]
+            value = division if division.isdigit() else variables.get(name)
+            try:
+                values.append(int(float(value)))
+            except (TypeError, ValueError):
+                return None
+        divisions.append(tuple(values))
+    return divisions
+
+
+def time_dirs(case_path):
+    """
+    Returns:
+        list: case 目录中按时间排序的 (时间, 目录名)。
+    """
+    dirs = []
+    for name in os.listdir(case_path):
+        try:
+            value = float(name)
+        except ValueError:
+            continue
+        if os.path.isdir(os.path.join(case_path, name)):
+            dirs.append((value, name))
+    return sorted(dirs)
+
+
+def read_time_range(case_path):
+    """
+    读取 controlDict 中的 startTime、endTime 与 deltaT。
+    startFrom 为 latestTime（如发散后从最后完整写出的时间步继续计算）时，startTime 为最新的时间步目录。
+
+    Returns:
+        tuple: (startTime, endTime, deltaT)，无法解析的值为 None。
+    """
+    control_dict_path = os.path.join(case_path, 'system', 'controlDict')
+    values = []
+    for key, default in (('startTime', '0'), ('endTime', None), ('deltaT', None)):
+        value = get_foam_dict_entry(control_dict_path, key) if os.path.exists(control_dict_path) else None
+        try:
+            values.append(float(value if value is not None else default))
+        except (TypeError, ValueError):
+            values.append(None)
+    if os.path.exists(control_dict_path) and get_foam_dict_entry(control_dict_path, 'startFrom') == 'latestTime':
+        dirs = time_dirs(case_path)
+        if dirs:
+            values[0] = dirs[-1][0]
+    return tuple(values)
+
+
+def adjusts_time_step(case_path):
+    """adjustTimeStep 打开时实际时间步由 Courant 数限制决定，deltaT 与 maxDeltaT 都不能给出时间步数。"""
+    control_dict_path = os.path.join(case_path, 'system', 'controlDict')
+    if not os.path.exists(control_dict_path):
+        return False
+    adjust_time_step = str(get_foam_dict_entry(control_dict_path, 'adjustTimeStep') or '').strip().rstrip(';').lower()
+    return adjust_time_step in ('yes', 'on', 'true', '1')
+
+
+def runs_meshing(case_path):
+    """Allrun 中是否有 blockMesh、snappyHexMesh 等网格生成命令。"""
+    allrun_path = os.path.join(case_path, 'Allrun')
+    if not os.path.exists(allrun_path):
+        return False
+    with open(allrun_path, 'r', errors='replace') as f:
+        return bool(MESHING_PATTERN.search(f.read()))
+
+
+class CostModel:
+    """
+    基于 网格数 x 时间步数 x 求解器单位耗时 估计算例运行时间，并据此给出超时时间。
+    求解器单位耗时（秒/网格/时间步）由历史收敛运行标定，保存在 JSON 文件中，多个 case 与多次运行共享。
+
+    Args:
+        path (str): 标定数据文件路径。
+        safety_factor (float): 超时时间 = safety_factor x 估计耗时。
+        min_timeout (float): 超时时间下限（秒）。
+        max_timeout (float): 超时时间上限（秒）。
+        mesh_allowance (float): Allrun 中有网格生成命令时额外给出的时间（秒），网格生成不计入求解器耗时的估计。
+    """
+
+    def __init__(self, path, safety_factor=5, min_timeout=600, max_timeout=12 * 60 * 60, mesh_allowance=0):
+        self.path = path
+        self.safety_factor = safety_factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.mesh_allowance = mesh_allowance
+        self.costs = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.costs = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                log_with_time(f"Failed to load cost model {path}: {e}")
+
+    def cell_step_cost(self, solver):
+        return self.costs.get(solver, {}).get('cost', DEFAULT_CELL_STEP_COST)
+
+    def estimate(self, case_path, n_procs=1):
+        """
+        估计 case 的运行耗时与超时时间。n_procs > 1 时按 MPI 并行进程数折算。
+        adjustTimeStep 打开时时间步数未知，无法估计（Courant 数限制下的时间步往往远小于 maxDeltaT）；
+        Allrun 中有网格生成命令时超时时间另加 mesh_allowance。
+
+        Returns:
+            dict: {'solver', 'cells', 'steps', 'start_time', 'end_time', 'seconds', 'timeout'}，
+                无法估计时 seconds 为 None，timeout 为 max_timeout。
+        """
+        control_dict_path = os.path.join(case_path, 'system', 'controlDict')
+        solver = get_solver_name(case_path) if os.path.exists(control_dict_path) else None
+        cells = count_cells(case_path)
+        start_time, end_time, delta_t = read_time_range(case_path)
+        steps = None
+        if end_time is not None and delta_t and not adjusts_time_step(case_path):
+            steps = max(1, int(round((end_time - start_time) / delta_t)))
+
+        seconds = None
+        timeout = self.max_timeout
+        if cells and steps:
+            seconds = cells * steps * self.cell_step_cost(solver) / max(1, n_procs)
+            timeout = max(self.min_timeout, self.safety_factor * seconds)
+            if runs_meshing(case_path):
+                timeout += self.mesh_allowance
+            timeout = min(self.max_timeout, timeout)
+        return {'solver': solver, 'cells': cells, 'steps': steps, 'start_time': start_time,
+                'end_time': end_time, 'seconds': seconds, 'timeout': timeout}
+
+    def update(self, solver, cells, steps, elapsed, n_procs=1):
+        """用一次成功运行的实际耗时更新求解器的单位耗时（按单进程计）并写回文件。"""
+        if not solver or not cells or not steps or elapsed <= 0:
+            return
+        cost = elapsed * max(1, n_procs) / (cells * steps)
+        entry = self.costs.get(solver)
+        if entry is None:
+            entry = {'cost': cost, 'samples': 0}
+        else:
+            entry['cost'] = (1 - CALIBRATION_WEIGHT) * entry['cost'] + CALIBRATION_WEIGHT * cost
+        entry['samples'] += 1
+        self.costs[solver] = entry
+
+        # 先写临时文件再替换，并发运行的 case 不会读到写了一半的文件
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.costs, f, indent=4)
+        os.replace(tmp_path, self.path)
+        log_with_time(f"cost model updated: {solver} {entry['cost']:.3e} s/cell/step ({entry['samples']} samples)")
+
+
+def progress_eta(estimate, current_time, elapsed):
+    """
+    根据当前时间步估计剩余时间。
+
+    Returns:
+        tuple: (进度 0~1, 剩余秒数)，无法估计时返回 (None, None)。
+    """
+    try:
+        current_time = float(current_time)
+    except (TypeError, ValueError):
+        return None, None
+    start_time, end_time = estimate.get('start_time'), estimate.get('end_time')
+    if start_time is None or end_time is None or end_time <= start_time:
+        return None, None
+    progress = min(1.0, max(0.0, (current_time - start_time) / (end_time - start_time)))
+    if progress <= 0:
+        return progress, None
+    return progress, elapsed * (1 - progress) / progress
@@ -0,0 +1,100 @@
+# 发散修正的确定性规则：直接修改输入文件字典（键为相对 case 目录的路径，值为文件内容字典），不需要调用 LLM。
+# 每条规则返回修改说明，不适用时返回 None。
+
+# 低于该时间步长时不再缩小 deltaT
+MIN_DELTA_T = 1e-5
+DELTA_T_SCALE = 0.1
+# 自适应时间步长的最大 Courant 数
+MAX_COURANT = 0.5
+RELAXATION_SCALE = 0.7
+MIN_RELAXATION = 0.1
+DEFAULT_RELAXATION_FACTORS = {
+    'fields': {'p': '0.3'},
+    'equations': {'U': '0.7', '".*"': '0.7'},
+}
+
+
+def _number(value):
+    try:
+        return float(str(value).strip().rstrip(';'))
+    except ValueError:
+        return None
+
+
+def _switch_on(value):
+    return str(value).strip().rstrip(';').lower() in ('yes', 'on', 'true', '1')
+
+
+def relax_steady_case(foamfiles, steady):
+    """稳态算例：添加亚松弛因子，已有时按 RELAXATION_SCALE 缩小。"""
+    fv_solution = foamfiles.get('system/fvSolution')
+    if not steady or not isinstance(fv_solution, dict):
+        return None
+    relaxation_factors = fv_solution.get('relaxationFactors')
+    if not isinstance(relaxation_factors, dict) or not relaxation_factors:
+        fv_solution['relaxationFactors'] = {group: dict(factors) for group, factors in DEFAULT_RELAXATION_FACTORS.items()}
+        return f"add relaxationFactors {DEFAULT_RELAXATION_FACTORS}"
+
+    scaled = []
+
+    def scale(factors):
+        for name, value in factors.items():
+            if isinstance(value, dict):
+                scale(value)
+                continue
+            factor = _number(value)
+            if factor is not None and factor > MIN_RELAXATION:
+                factors[name] = f"{max(MIN_RELAXATION, factor * RELAXATION_SCALE):.3g}"
+                scaled.append(name)
+
+    scale(relaxation_factors)
+    return f"scale relaxationFactors of {scaled} by {RELAXATION_SCALE}" if scaled else None
+
+
+def adjust_time_step(foamfiles, steady):
+    """PIMPLE 瞬态算例：打开 adjustTimeStep 并限制 maxCo。"""
+    control_dict = foamfiles.get('system/controlDict')
+    fv_solution = foamfiles.get('system/fvSolution')
+    # PISO 求解器（icoFoam 等）不支持 adjustTimeStep
+    if steady or not isinstance(control_dict, dict) or not isinstance(fv_solution, dict) or 'PIMPLE' not in fv_solution:
+        return None
+    max_co = _number(control_dict.get('maxCo', ''))
+    if _switch_on(control_dict.get('adjustTimeStep', 'no')) and max_co is not None and max_co <= MAX_COURANT:
+        return None
+    control_dict['adjustTimeStep'] = 'yes'
+    control_dict['maxCo'] = f"{MAX_COURANT:g}"
+    return f"set adjustTimeStep yes, maxCo {MAX_COURANT:g}"
+
+
+def scale_delta_t(foamfiles, steady):
+    """瞬态算例：deltaT 缩小为 DELTA_T_SCALE 倍。"""
+    control_dict = foamfiles.get('system/controlDict')
+    if steady or not isinstance(control_dict, dict):
+        return None
+    delta_t = _number(control_dict.get('deltaT', ''))
+    if delta_t is None or delta_t <= MIN_DELTA_T:
+        return None
+    control_dict['deltaT'] = f"{delta_t * DELTA_T_SCALE:g}"
+    return f"scale deltaT {delta_t:g} -> {control_dict['deltaT']}"
+
+
+DIVERGENCE_RULES = (relax_steady_case, adjust_time_step, scale_delta_t)
+
+
+def apply_divergence_rules(foamfiles, steady):
+    """
+    依次应用所有适用的发散修正规则。
+
+    Args:
+        foamfiles (dict): 输入文件字典，原地修改。
+        steady (bool): 是否为稳态算例。
+
+    Returns:
+        list: 已应用规则的修改说明，为空表示没有适用的规则。
+    """
+    applied = []
+    for rule in DIVERGENCE_RULES:
+        description = rule(foamfiles, steady)
+        if description is not None:
+            applied.append(description)
+    return applied
@@ -0,0 +1,286 @@
+import os
+import re
+import copy
+import json
+
+from utils.util import log_with_time
+
+# FOAM FATAL (IO) ERROR 块中错误信息结束的位置
+MESSAGE_END_PATTERN = re.compile(r'^(From\b|file:|FOAM exiting|FOAM aborting|in file\b)')
+# "/abs/path/case/system/fvSchemes/divSchemes" -> "system/fvSchemes/divSchemes"
+CASE_PATH_PATTERN = re.compile(r'"[^"]*?/((?:system|constant|\d[\d.e+-]*)/[^"]*)"')
+NUMBER_PATTERN = re.compile(r'(?<![\w.])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w.])')
+
+MISSING_ENTRY_PATTERN = r'(?:keyword (\S+) is undefined|Entry \'(\S+)\' not found) in dictionary "'
+REFERENCE_CELL_PATTERN = re.compile(r'Unable to set reference cell for field (\w+)')
+MISSING_SCHEME_PATTERN = re.compile(MISSING_ENTRY_PATTERN + r'system/fvSchemes/(\w+)"')
+MISSING_SOLVER_PATTERN = re.compile(MISSING_ENTRY_PATTERN + r'system/fvSolution/solvers"')
+MISSING_ALGORITHM_ENTRY_PATTERN = re.compile(MISSING_ENTRY_PATTERN + r'system/fvSolution/(SIMPLE|PISO|PIMPLE)"')
+
+SCHEME_DEFAULTS = {
+    'ddtSchemes': 'Euler',
+    'gradSchemes': 'Gauss linear',
+    'divSchemes': 'Gauss linear',
+    'laplacianSchemes': 'Gauss linear corrected',
+    'interpolationSchemes': 'linear',
+    'snGradSchemes': 'corrected',
+}
+ALGORITHM_DEFAULTS = {
+    'nCorrectors': '2',
+    'nOuterCorrectors': '1',
+    'nNonOrthogonalCorrectors': '0',
+    'momentumPredictor': 'yes',
+    'consistent': 'yes',
+}
+PRESSURE_FIELDS = ('p', 'p_rgh', 'pcorr', 'Phi')
+# 成功率低于该值的修正不再使用（失败过一次、从未成功的修正为 1/3）
+MIN_FIX_SCORE = 0.5
+
+
+def error_signature(error_content):
+    """
+    提取 FOAM FATAL (IO) ERROR 块中的错误信息并归一化：case 路径改为相对路径，数字替换为 N，
+    同一类错误在不同 case、不同运行中得到相同的签名。
+
+    Returns:
+        str: 错误签名，没有 FOAM FATAL 错误时返回 None。
+    """
+    lines = error_content.splitlines()
+    start = next((i for i, line in enumerate(lines) if 'FOAM FATAL' in line.upper()), None)
+    if start is None:
+        return None
+    message = []
+    for line in lines[start + 1:]:
+        line = line.strip()
+        if MESSAGE_END_PATTERN.match(line):
+            break
+        if line:
+            line = CASE_PATH_PATTERN.sub(r'"\1"', line)
+            message.append(NUMBER_PATTERN.sub('N', line))
+    return '\n'.join(message) or None
+
+
+def _algorithm_dict(foamfiles):
+    fv_solution = foamfiles.get('system/fvSolution', {})
+    return next((name for name in ('SIMPLE', 'PIMPLE', 'PISO') if isinstance(fv_solution.get(name), dict)), None)
+
+
+def _is_steady(foamfiles):
+    ddt_schemes = foamfiles.get('system/fvSchemes', {}).get('ddtSchemes', {})
+    return isinstance(ddt_schemes, dict) and 'steadyState' in str(ddt_schemes.get('default', ''))
+
+
+def fix_reference_cell(signature, foamfiles):
+    """Unable to set reference cell for field p：在 SIMPLE/PIMPLE/PISO 中添加 pRefCell 与 pRefValue。"""
+    algorithm = _algorithm_dict(foamfiles)
+    if not REFERENCE_CELL_PATTERN.search(signature) or algorithm is None:
+        return None
+    return [{'op': 'set', 'path': ['system/fvSolution', algorithm, 'pRefCell'], 'value': '0'},
+            {'op': 'set', 'path': ['system/fvSolution', algorithm, 'pRefValue'], 'value': '0'}]
+
+
+def fix_missing_scheme(signature, foamfiles):
+    """fvSchemes 中缺少某一项格式：添加常用的默认格式。"""
+    match = MISSING_SCHEME_PATTERN.search(signature)
+    if not match:
+        return None
+    keyword, scheme_dict = match.group(1) or match.group(2), match.group(3)
+    if scheme_dict == 'wallDist':
+        return [{'op': 'set', 'path': ['system/fvSchemes', 'wallDist', 'method'], 'value': 'meshWave'}]
+    if scheme_dict not in SCHEME_DEFAULTS:
+        return None
+    scheme = SCHEME_DEFAULTS[scheme_dict]
+    if scheme_dict == 'divSchemes' and keyword.startswith('div(phi'):
+        # 对流项使用迎风格式，稳态算例需要 bounded
+        scheme = 'bounded Gauss upwind' if _is_steady(foamfiles) else 'Gauss upwind'
+    return [{'op': 'set', 'path': ['system/fvSchemes', scheme_dict, keyword.strip('"')], 'value': scheme}]
+
+
+def fix_missing_solver(signature, foamfiles):
+    """fvSolution/solvers 中缺少某个场的线性求解器：xxxFinal 复制 xxx 并设置 relTol 0，其余添加默认求解器。"""
+    match = MISSING_SOLVER_PATTERN.search(signature)
+    if not match:
+        return None
+    field = (match.group(1) or match.group(2)).strip('"')
+    solvers = foamfiles.get('system/fvSolution', {}).get('solvers', {})
+    if field.endswith('Final') and isinstance(solvers.get(field[:-len('Final')]), dict):
+        solver = copy.deepcopy(solvers[field[:-len('Final')]])
+        solver['relTol'] = '0'
+    elif field in PRESSURE_FIELDS:
+        solver = {'solver': 'GAMG', 'smoother': 'GaussSeidel', 'tolerance': '1e-06', 'relTol': '0.05'}
+    else:
+        solver = {'solver': 'smoothSolver', 'smoother': 'symGaussSeidel', 'tolerance': '1e-05', 'relTol': '0.1'}
+    if field.endswith('Final'):
+        solver['relTol'] = '0'
+    return [{'op': 'set', 'path': ['system/fvSolution', 'solvers', field], 'value': solver}]
+
+
+def fix_missing_algorithm_entry(signature, foamfiles):
+    """SIMPLE/PISO/PIMPLE 中缺少 nCorrectors 等控制参数：添加默认值。"""
+    match = MISSING_ALGORITHM_ENTRY_PATTERN.search(signature)
+    if not match:
+        return None
+    keyword, algorithm = match.group(1) or match.group(2), match.group(3)
+    if keyword not in ALGORITHM_DEFAULTS:
+        return None
+    return [{'op': 'set', 'path': ['system/fvSolution', algorithm, keyword], 'value': ALGORITHM_DEFAULTS[keyword]}]
+
+
+KNOWN_FIXES = (fix_reference_cell, fix_missing_scheme, fix_missing_solver, fix_missing_algorithm_entry)
+
+
+def known_fix(signature, foamfiles):
+    """
+    按错误签名匹配内置的已知修正。
+
+    Returns:
+        list: 第一个适用的已知修正的 patch 操作，没有适用的修正时返回 None。
+    """
+    for fix in KNOWN_FIXES:
+        ops = fix(signature, foamfiles)
+        if ops:
+            return ops
+    return None
+
+
+def diff_foamfiles(before, after, path=()):
+    """
+    比较两份输入文件字典，返回把 before 变为 after 的 patch 操作。
+
+    Returns:
+        list: [{'op': 'set', 'path': [...], 'value': ...}, {'op': 'delete', 'path': [...]}]
+    """
+    ops = []
+    for key, value in after.items():
+        if key in before and isinstance(before[key], dict) and isinstance(value, dict):
+            ops.extend(diff_foamfiles(before[key], value, path + (key,)))
+        elif key not in before or before[key] != value:
+            ops.append({'op': 'set', 'path': list(path + (key,)), 'value': value})
+    for key in before:
+        if key not in after:
+            ops.append({'op': 'delete', 'path': list(path + (key,))})
+    return ops
+
+
+def apply_patch(foamfiles, ops):
+    """
+    将 patch 操作原地应用到输入文件字典。
+
+    Returns:
+        bool: 输入文件是否有变化。
+    """
+    changed = False
+    for op in ops:
+        node = foamfiles
+        for key in op['path'][:-1]:
+            if not isinstance(node.get(key), dict):
+                if op['op'] == 'delete':
+                    break
+                node[key] = {}
+            node = node[key]
+        else:
+            key = op['path'][-1]
+            if op['op'] == 'set' and node.get(key) != op['value']:
+                node[key] = copy.deepcopy(op['value'])
+                changed = True
+            elif op['op'] == 'delete' and key in node:
+                del node[key]
+                changed = True
+    return changed
+
+
+def parents_exist(foamfiles, path):
+    """patch 操作要修改的键的上层字典在输入文件中是否都存在。"""
+    node = foamfiles
+    for key in path[:-1]:
+        if not isinstance(node, dict) or not isinstance(node.get(key), dict):
+            return False
+        node = node[key]
+    return True
+
+
+def fix_score(fix):
+    # 成功率的拉普拉斯平滑估计，没有记录的修正为 0.5
+    return (fix['success'] + 1) / (fix['attempts'] + 2)
+
+
+class ErrorFixIndex:
+    """
+    (求解器, 错误签名) -> 修正 的持久化记录：内置常见错误的确定性修正，
+    并记录每次修正（内置、记录中的或 LLM 给出的）在下一次运行中是否消除了该错误，按成功率排序复用。
+    修正以 patch 操作（对输入文件字典的 set/delete）保存，可以直接应用到其他 case 的输入文件上。
+
+    Args:
+        path (str): 修正记录的保存路径，多个 case 与多次运行共享。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fixes = self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                log_with_time(f"Failed to load error index {self.path}: {e}")
+        return {}
+
+    def candidates(self, signature, solver, foamfiles):
+        """
+        列出错误的候选修正，按成功率从高到低排序；同一求解器的记录优先于其他求解器的记录，
+        成功率低于 MIN_FIX_SCORE 的修正不再使用。
+        记录中的修正来自其他 case，只保留上层字典在本 case 的输入文件中存在的操作（不写入其他 case 的 patch 或文件）；
+        其他求解器的记录只复用内置修正的成功率，不使用其他求解器的 LLM 修正。
+
+        Returns:
+            list: [(patch 操作, 来源 'known'/'learned', 成功率)]
+        """
+        if not signature:
+            return []
+        candidates = []
+        known_ops = known_fix(signature, foamfiles)
+        records = [(fix, 0) for fix in self.fixes.get(solver or '', {}).get(signature, [])]
+        records += [(fix, 1) for other_solver, entries in self.fixes.items() if other_solver != (solver or '')
+                    for fix in entries.get(signature, []) if known_ops and fix['ops'] == known_ops]
+        if known_ops and not any(fix['ops'] == known_ops for fix, _ in records):
+            records.append(({'ops': known_ops, 'success': 0, 'attempts': 0}, 0))
+        seen = []
+        for fix, priority in records:
+            if fix['ops'] in seen:
+                continue
+            seen.append(fix['ops'])
+            if fix['ops'] == known_ops:
+                candidates.append((known_ops, 'known', fix_score(fix), priority))
+                continue
+            ops = [op for op in fix['ops'] if parents_exist(foamfiles, op['path'])]
+            if ops:
+                candidates.append((ops, 'learned', fix_score(fix), priority))
+        candidates = [c for c in candidates if c[2] >= MIN_FIX_SCORE]
+        # 成功率相同时同一求解器的记录、内置修正优先
+        candidates.sort(key=lambda c: (-c[2], c[3], c[1] != 'known'))
+        return [(ops, source, score) for ops, source, score, _ in candidates]
+
+    def record(self, signature, solver, ops, success):
+        """记录一次修正的结果并写回文件。"""
+        if not signature or not ops:
+            return
+        # 重新读取，合并并发运行写入的记录
+        self.fixes = self.load()
+        fixes = self.fixes.setdefault(solver or '', {}).setdefault(signature, [])
+        fix = next((fix for fix in fixes if fix['ops'] == ops), None)
+        if fix is None:
+            fix = {'ops': ops, 'success': 0, 'attempts': 0}
+            fixes.append(fix)
+        fix['attempts'] += 1
+        fix['success'] += int(success)
+        fixes.sort(key=fix_score, reverse=True)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.fixes, f, indent=4)
+        os.replace(tmp_path, self.path)
+        log_with_time(f"error index: fix for {solver} {'succeeded' if success else 'failed'} "
+                      f"({fix['success']}/{fix['attempts']}):\n{signature}")
@@ -0,0 +1,176 @@
+import re
+
+FOAM_FILES_MARKER = "# Foam files:"
+REQUIRED_FIELDS = ('0/U', '0/p')
+NUMBER_PATTERN = re.compile(r'-?(0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?')
+# json.loads 接受的非数字字面量
+LITERALS = ('true', 'false', 'null', 'NaN', 'Infinity', '-Infinity')
+LITERAL_CHARS = set('0123456789+-.eEtruefalsnNIiy')
+HEX_DIGITS = set('0123456789abcdefABCDEF')
+ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class FoamFilesStreamValidator:
+    """
+    流式生成 InputWriter 回复时增量校验 "# Foam files:" 之后的 JSON：
+    JSON 结构出错，或 0/U、0/p 的 boundaryField 已经结束但缺少网格中的 patch 时立即报错，
+    不必等生成结束再由 json.loads 与 boundaryField 检查发现。与 json.loads(strict=False) 一致，字符串中允许控制字符。
+
+    Args:
+        patch_names (list): 网格中的 patch 名，0/U 与 0/p 的 boundaryField 中都必须有。
+
+    Attributes:
+        done (bool): 顶层 JSON 对象是否已经结束（结束后不再校验）。
+    """
+
+    def __init__(self, patch_names):
+        self.patch_names = [name for name in patch_names if name]
+        self.done = False
+        self._text = ''
+        self._started = False
+        # 每层容器：{'type': 'object'/'array', 'path': [...], 'keys': set(), 'key': 当前键}
+        self._stack = []
+        self._expect = 'value'
+        self._in_string = False
+        self._escape = False
+        # \u 转义之后还需要的十六进制数字个数
+        self._unicode = 0
+        self._is_key = False
+        self._string = []
+        self._literal = None
+
+    def feed(self, text):
+        """
+        校验新生成的文本。
+
+        Raises:
+            ValueError: JSON 结构出错或缺少必需的 patch。
+        """
+        if self.done:
+            return
+        if not self._started:
+            self._text += text
+            begin = self._text.find(FOAM_FILES_MARKER)
+            if begin < 0:
+                return
+            left_bracket = self._text.find('{', begin)
+            if left_bracket < 0:
+                return
+            self._started = True
+            text = self._text[left_bracket:]
+            self._text = ''
+        for char in text:
+            self._feed_char(char)
+            if self.done:
+                return
+
+    def _feed_char(self, char):
+        if self._in_string:
+            if self._unicode:
+                if char not in HEX_DIGITS:
+                    raise ValueError(f"invalid escape \\u...{char} in Foam Files JSON")
+                self._unicode -= 1
+                if self._is_key:
+                    self._string.append(char)
+            elif self._escape:
+                if char not in '"\\/bfnrtu':
+                    raise ValueError(f"invalid escape \\{char} in Foam Files JSON")
+                self._escape = False
+                if char == 'u':
+                    self._unicode = 4
+                if self._is_key:
+                    self._string.append(ESCAPES.get(char, '\\' + char))
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._is_key:
+                    self._stack[-1]['key'] = ''.join(self._string)
+                    self._stack[-1]['keys'].add(self._stack[-1]['key'])
+                    self._expect = 'colon'
+                else:
+                    self._value_done()
+            elif self._is_key:
+                self._string.append(char)
+            return
+
+        if self._literal is not None:
+            if char in LITERAL_CHARS:
+                self._literal += char
+                return
+            if self._literal not in LITERALS and not NUMBER_PATTERN.fullmatch(self._literal):
+                raise ValueError(f"invalid literal {self._literal} in Foam Files JSON")
+            self._literal = None
+            self._value_done()
+
+        if char.isspace():
+            return
+        expect = self._expect
+        if expect in ('value', 'value_or_end'):
+            if char == '{':
+                self._push('object')
+                self._expect = 'key_or_end'
+            elif char == '[':
+                self._push('array')
+                self._expect = 'value_or_end'
+            elif char == '"':
+                self._start_string(is_key=False)
+            elif char in '-0123456789tfnNI':
+                self._literal = char
+            elif char == ']' and expect == 'value_or_end':
+                self._pop()
+            else:
+                raise ValueError(f"unexpected {char!r} in Foam Files JSON, expecting a value")
+        elif expect in ('key', 'key_or_end'):
+            if char == '"':
+                self._start_string(is_key=True)
+            elif char == '}' and expect == 'key_or_end':
+                self._pop()
+            else:
+                raise ValueError(f"unexpected {char!r} in Foam Files JSON, expecting a key")
+        elif expect == 'colon':
+            if char != ':':
+                raise ValueError(f"unexpected {char!r} in Foam Files JSON, expecting ':'")
+            self._expect = 'value'
+        elif expect == 'comma_or_end':
+            container = self._stack[-1]['type']
+            if char == ',':
+                self._expect = 'key' if container == 'object' else 'value'
+            elif (char == '}' and container == 'object') or (char == ']' and container == 'array'):
+                self._pop()
+            else:
+                raise ValueError(f"unexpected {char!r} in Foam Files JSON, expecting ',' or the end of {container}")
+
+    def _start_string(self, is_key):
+        self._in_string = True
+        self._is_key = is_key
+        self._string = []
+
+    def _push(self, container):
+        path = self._stack[-1]['path'] + [self._stack[-1]['key']] if self._stack else []
+        self._stack.append({'type': container, 'path': path, 'keys': set(), 'key': None})
+
+    def _pop(self):
+        frame = self._stack.pop()
+        if frame['type'] == 'object':
+            self._check_object(frame['path'], frame['keys'])
+        self._value_done()
+
+    def _value_done(self):
+        if self._stack:
+            self._expect = 'comma_or_end'
+        else:
+            self.done = True
+
+    def _check_object(self, path, keys):
+        # 与 InputWriterAction 中生成结束后的 boundaryField 检查一致
+        if not path:
+            missing_fields = [field for field in REQUIRED_FIELDS if field not in keys]
+            if missing_fields and self.patch_names:
+                raise ValueError(f"Foam Files has no {missing_fields}")
+        elif len(path) == 1 and path[0] in REQUIRED_FIELDS and 'boundaryField' not in keys and self.patch_names:
+            raise ValueError(f"{path[0]} has no boundaryField")
+        elif len(path) == 2 and path[0] in REQUIRED_FIELDS and path[1] == 'boundaryField':
+            missing_patches = [patch for patch in self.patch_names if patch not in keys]
+            if missing_patches:
+                raise ValueError(f"Patch {missing_patches} 未在 {path[0]} 的 boundaryField 中找到.")
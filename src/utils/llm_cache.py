@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# path -> LLMResponseCache，同一进程中的所有运行共享
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def request_hash(model, temperature, system_msg, prompt):
+    """模型、temperature、system prompt 与 prompt 的哈希。"""
+    return hashlib.sha256(json.dumps([model, temperature, system_msg, prompt]).encode()).hexdigest()
+
+
+def get_llm_cache(path, max_entries=10000, ttl=0):
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMResponseCache(path, max_entries, ttl)
+        return _caches[path]
+
+
+class LLMResponseCache:
+    """
+    保存在 sqlite 中的 LLM 回复缓存，多个运行、多次 benchmark 之间共享。
+    超过 max_entries 时按最近访问时间淘汰（LRU），超过 ttl 秒的缓存项视为过期。
+
+    Args:
+        path (str): sqlite 数据库路径。
+        max_entries (int): 最多保存的回复数，0 表示不限制。
+        ttl (float): 缓存项的有效时间（秒），0 表示不过期。
+
+    Attributes:
+        hits (int): 本进程中命中的次数。
+        misses (int): 本进程中未命中的次数。
+    """
+
+    def __init__(self, path, max_entries=10000, ttl=0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # AsyncQA_Ori 在线程池中调用，连接由锁保护；timeout 等待其他进程的写锁
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                           'key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def get(self, key):
+        """
+        Returns:
+            str: 缓存的回复，未命中或已过期时返回 None。
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT response, created FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        """保存回复，并淘汰过期与最久未访问的缓存项。"""
+        if response is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)',
+                               (key, response, now, now))
+            if self.ttl:
+                self._conn.execute('DELETE FROM responses WHERE created < ?', (now - self.ttl,))
+            if self.max_entries:
+                self._conn.execute('DELETE FROM responses WHERE key IN '
+                                   '(SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                                   (self.max_entries,))
@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import threading
+import collections
+
+from utils.llm_cache import request_hash
+
+# path -> LLMRecorder，同一进程中的所有运行共享
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def get_llm_recorder(path):
+    with _recorders_lock:
+        if path not in _recorders:
+            _recorders[path] = LLMRecorder(path)
+        return _recorders[path]
+
+
+class LLMRecorder:
+    """
+    把每次 LLM 请求与回复（含 token 用量与耗时）追加写入 jsonl 文件，供 llm_server.py 离线回放。
+    每条记录一次 write 追加写入，benchmark 的多个进程可以写同一个文件。
+
+    Args:
+        path (str): 记录文件路径。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def record(self, model, temperature, system_msg, prompt, response, usage, latency):
+        """
+        Args:
+            model (str): 请求中的 model 字段。
+            temperature (float): 请求中的 temperature，没有设置时为 None。
+            usage (dict): {'prompt_tokens', 'completion_tokens', 'total_tokens'}。
+            latency (float): 请求耗时（秒）。
+        """
+        line = json.dumps({
+            'time': time.time(),
+            'model': model,
+            'temperature': temperature,
+            'system': system_msg,
+            'prompt': prompt,
+            'response': response,
+            'usage': usage,
+            'latency': latency,
+        }) + '\n'
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line)
+
+
+class ReplayIndex:
+    """
+    按请求查找记录的回复。相同的请求被记录多次时依次返回各次的回复，用完后从头循环；
+    没有 temperature 完全相同的记录时，使用其他 temperature 下相同请求的记录。
+
+    Args:
+        records (list): LLMRecorder 写入的记录。
+    """
+
+    def __init__(self, records):
+        self.records = collections.defaultdict(list)
+        self.any_temperature = collections.defaultdict(list)
+        for record in records:
+            self.records[request_hash(record['model'], record['temperature'], record['system'], record['prompt'])].append(record)
+            self.any_temperature[request_hash(record['model'], None, record['system'], record['prompt'])].append(record)
+        self._served = collections.Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, paths):
+        records = []
+        for path in paths:
+            with open(path, 'r') as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+        return cls(records)
+
+    def __len__(self):
+        return sum(len(records) for records in self.records.values())
+
+    def lookup(self, model, temperature, system_msg, prompt):
+        """
+        Returns:
+            dict: 匹配的记录，没有记录时返回 None。
+        """
+        key = request_hash(model, temperature, system_msg, prompt)
+        records = self.records.get(key)
+        if not records:
+            key = request_hash(model, None, system_msg, prompt)
+            records = self.any_temperature.get(key)
+        if not records:
+            return None
+        with self._lock:
+            index = self._served[key] % len(records)
+            self._served[key] += 1
+        return records[index]
@@ -0,0 +1,161 @@
+import os
+import re
+import glob
+import math
+import time
+import collections
+
+# OpenFOAM 求解器日志中每个时间步的关键信息
+TIME_PATTERN = re.compile(r'^Time = ([-+\w.]+?)s?$')
+COURANT_PATTERN = re.compile(r'^Courant Number mean: ([-+\w.]+) max: ([-+\w.]+)')
+RESIDUAL_PATTERN = re.compile(r'Solving for (\w+), Initial residual = ([-+\w.]+), Final residual = ([-+\w.]+), No Iterations (\d+)')
+CONTINUITY_PATTERN = re.compile(r'^time step continuity errors : sum local = ([-+\w.]+), global = ([-+\w.]+)')
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        # 例如 '-nan'、'nan'、'inf'
+        return float('nan')
+
+
+class FoamLogMonitor:
+    """
+    在求解器运行期间增量读取 case 目录下的 log.*Foam，逐时间步解析残差、Courant 数与连续性误差，
+    并判断是否满足发散条件。
+
+    Args:
+        case_path (str): case 目录的绝对路径。
+        max_courant (float): Courant 数上限，超过即判为发散。
+        max_residual (float): 残差上限，超过即判为发散。
+        max_continuity_error (float): 连续性误差（sum local）上限，超过即判为发散。
+        steady (bool): 是否为稳态求解器（simpleFoam 等），为 True 时检测残差平台。
+        steady_tolerance (float): 稳态收敛时各变量 Initial residual 的上限。
+        steady_window (int): 判断残差平台所用的滑动窗口（迭代步数）。
+        steady_plateau (float): 窗口内最大 Initial residual 的相对变化小于该值即视为平台。
+
+    Attributes:
+        time (str): 最近解析到的时间步。
+        steps (int): 已解析的时间步数。
+        first_step_time (float): 解析到第一个时间步时的 time.time()，之前的网格生成等不计入求解器耗时。
+        courant (float): 最近时间步的最大 Courant 数。
+        residuals (dict): 最近时间步各变量的 (Initial residual, Final residual)。
+        continuity_error (float): 最近时间步的连续性误差（sum local）。
+        divergence (dict): 满足发散条件时为 {'file', 'time', 'reason'}，否则为 None。
+        converged (dict): 稳态残差进入平台时为 {'file', 'time', 'residual'}，否则为 None。
+    """
+
+    def __init__(self, case_path, max_courant=100, max_residual=1e3, max_continuity_error=1.0,
+                 steady=False, steady_tolerance=1e-4, steady_window=50, steady_plateau=0.1):
+        self.case_path = case_path
+        self.max_courant = max_courant
+        self.max_residual = max_residual
+        self.max_continuity_error = max_continuity_error
+        self.steady = steady
+        self.steady_tolerance = steady_tolerance
+        self.steady_window = steady_window
+        self.steady_plateau = steady_plateau
+
+        self.time = None
+        self.steps = 0
+        self.first_step_time = None
+        self.courant = None
+        self.residuals = {}
+        self.continuity_error = None
+        self.divergence = None
+        self.converged = None
+
+        self._step_residuals = collections.deque(maxlen=steady_window)
+        self._offsets = {}
+        self._partial = {}
+
+    def poll(self):
+        """
+        读取所有 log.*Foam 自上次调用以来新写入的内容并解析。
+
+        Returns:
+            dict: 满足发散条件时返回发散信息 {'file', 'time', 'reason'}，否则返回 None。
+        """
+        for log_path in sorted(glob.glob(os.path.join(self.case_path, 'log.*Foam'))):
+            for line in self._read_new_lines(log_path):
+                self.parse_line(line, os.path.basename(log_path))
+                if self.divergence is not None:
+                    return self.divergence
+        return None
+
+    def _read_new_lines(self, log_path):
+        offset = self._offsets.get(log_path, 0)
+        try:
+            with open(log_path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        self._offsets[log_path] = offset + len(data)
+        text = self._partial.get(log_path, '') + data.decode(errors='replace')
+        lines = text.split('\n')
+        # 最后一行可能还没写完，留到下次再解析
+        self._partial[log_path] = lines.pop()
+        return lines
+
+    def parse_line(self, line, log_file=''):
+        line = line.strip()
+
+        match = TIME_PATTERN.match(line)
+        if match:
+            self._check_steady(log_file)
+            self.time = match.group(1)
+            self.steps += 1
+            if self.first_step_time is None:
+                self.first_step_time = time.time()
+            self.residuals = {}
+            return
+
+        match = COURANT_PATTERN.match(line)
+        if match:
+            self.courant = _to_float(match.group(2))
+            if not math.isfinite(self.courant):
+                self._diverge(log_file, f"Courant Number is {match.group(2)}")
+            elif self.courant > self.max_courant:
+                self._diverge(log_file, f"Courant Number max {self.courant} > {self.max_courant}")
+            return
+
+        match = RESIDUAL_PATTERN.search(line)
+        if match:
+            field = match.group(1)
+            initial_residual = _to_float(match.group(2))
+            final_residual = _to_float(match.group(3))
+            self.residuals[field] = (initial_residual, final_residual)
+            for name, residual in (('Initial', initial_residual), ('Final', final_residual)):
+                if not math.isfinite(residual):
+                    self._diverge(log_file, f"{name} residual of {field} is {residual}")
+                    return
+                if residual > self.max_residual:
+                    self._diverge(log_file, f"{name} residual of {field} {residual} > {self.max_residual}")
+                    return
+            return
+
+        match = CONTINUITY_PATTERN.match(line)
+        if match:
+            self.continuity_error = _to_float(match.group(1))
+            if not math.isfinite(self.continuity_error):
+                self._diverge(log_file, f"time step continuity error is {match.group(1)}")
+            elif self.continuity_error > self.max_continuity_error:
+                self._diverge(log_file, f"time step continuity error {self.continuity_error} > {self.max_continuity_error}")
+
+    def _check_steady(self, log_file):
+        # 在新时间步开始时，用上一步的 Initial residual 更新滑动窗口
+        if not self.steady or not self.residuals or self.converged is not None:
+            return
+        self._step_residuals.append(max(initial for initial, _ in self.residuals.values()))
+        if len(self._step_residuals) < self.steady_window:
+            return
+        window_max = max(self._step_residuals)
+        window_min = min(self._step_residuals)
+        if window_max < self.steady_tolerance and window_max - window_min <= self.steady_plateau * window_max:
+            self.converged = {'file': log_file, 'time': self.time, 'residual': window_max}
+
+    def _diverge(self, log_file, reason):
+        if self.divergence is None:
+            self.divergence = {'file': log_file, 'time': self.time, 'reason': reason}
@@ -0,0 +1,106 @@
+import os
+import re
+import uuid
+import shutil
+import hashlib
+import subprocess
+
+from utils.util import log_with_time
+
+# 会修改 constant/polyMesh 的网格工具：Allrun 中含有这些命令时 polyMesh 不再是 blockMesh 的输出，不写入缓存
+MESH_COMMANDS = ('snappyHexMesh', 'createPatch', 'refineMesh', 'topoSet', 'extrudeMesh', 'mirrorMesh', 'transformPoints',
+                 'renumberMesh', 'createBaffles', 'mergeMeshes', 'stitchMesh', 'changeDictionary', 'setsToZones',
+                 'subsetMesh', 'splitMeshRegions', 'collapseEdges', 'polyDualMesh', 'flattenMesh', 'refineHexMesh')
+MESH_COMMAND_PATTERN = re.compile(r'\b(' + '|'.join(MESH_COMMANDS) + r')\b')
+
+
+def copy_tree(src, dst):
+    # 支持 reflink 的文件系统（btrfs、xfs 等）上为写时复制，几乎不占用时间与空间；否则退化为普通复制
+    try:
+        subprocess.run(['cp', '-r', '--reflink=auto', src, dst], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        shutil.rmtree(dst, ignore_errors=True)
+        shutil.copytree(src, dst)
+
+
+class MeshCache:
+    """
+    以 blockMeshDict 内容与 OpenFOAM 版本的哈希为键缓存 blockMesh 生成的 constant/polyMesh，
+    多次运行与多轮修正之间网格输入不变时直接复制缓存的网格，跳过 blockMesh。
+
+    缓存的网格通过 reflink 复制而非硬链接放入 case：OpenFOAM 写文件时会截断原文件，
+    后续命令（如 createPatch -overwrite）改写硬链接的网格会破坏缓存。
+
+    Args:
+        path (str): 缓存目录，多个 case 与多次运行共享。
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @staticmethod
+    def key(case_path):
+        """
+        Returns:
+            str: case 的网格缓存键，没有 system/blockMeshDict 时返回 None。
+        """
+        block_mesh_dict_path = os.path.join(case_path, 'system', 'blockMeshDict')
+        if not os.path.exists(block_mesh_dict_path):
+            return None
+        digest = hashlib.sha256()
+        digest.update(f"{os.getenv('WM_PROJECT', '')}-{os.getenv('WM_PROJECT_VERSION', '')}\n".encode())
+        with open(block_mesh_dict_path, 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    def restore(self, case_path):
+        """
+        case 中还没有 constant/polyMesh 且缓存命中时，把缓存的网格复制到 case 中。
+
+        Returns:
+            bool: 是否使用了缓存的网格。
+        """
+        key = self.key(case_path)
+        poly_mesh_path = os.path.join(case_path, 'constant', 'polyMesh')
+        cached_path = os.path.join(self.path, key or '', 'polyMesh')
+        if key is None or os.path.exists(poly_mesh_path) or not os.path.isdir(cached_path):
+            return False
+        os.makedirs(os.path.dirname(poly_mesh_path), exist_ok=True)
+        copy_tree(cached_path, poly_mesh_path)
+        log_with_time(f"[INFO MESH CACHE] {case_path}: use cached mesh {key[:12]}")
+        return True
+
+    def store(self, case_path):
+        """
+        本次运行中 blockMesh 正常结束、且之后没有其他命令修改网格时，把 constant/polyMesh 写入缓存。
+
+        Returns:
+            bool: 是否写入了缓存。
+        """
+        key = self.key(case_path)
+        if key is None or os.path.isdir(os.path.join(self.path, key)):
+            return False
+        log_path = os.path.join(case_path, 'log.blockMesh')
+        poly_mesh_path = os.path.join(case_path, 'constant', 'polyMesh')
+        if not os.path.exists(log_path) or not os.path.isdir(poly_mesh_path):
+            return False
+        with open(log_path, 'r', errors='replace') as f:
+            log = f.read()
+        if 'FOAM FATAL' in log or not re.search(r'^End\s*$', log, re.MULTILINE):
+            return False
+        with open(os.path.join(case_path, 'Allrun'), 'r') as f:
+            if MESH_COMMAND_PATTERN.search(f.read()):
+                return False
+
+        # 先复制到临时目录再重命名，并发运行同时写入同一个键时只有一个生效
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, f".tmp-{key}-{uuid.uuid4().hex}")
+        os.makedirs(tmp_path)
+        try:
+            copy_tree(poly_mesh_path, os.path.join(tmp_path, 'polyMesh'))
+            os.rename(tmp_path, os.path.join(self.path, key))
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+        log_with_time(f"[INFO MESH CACHE] {case_path}: cached mesh {key[:12]}")
+        return True
@@ -3,12 +3,12 @@ import sys
 import re
 import json
 import shutil
+import filecmp
 import subprocess
 import collections
 import time, datetime
 import inspect
 
-from openai import OpenAI
 #from utils.parser_openfoam import parse_nested_string, dict_to_string
 from utils.butterfly.foamfile import FoamFile
 
@@ -117,6 +117,121 @@ def read_dict_and_create_files(file_dict, case_path):
             file_content = body(single_file)
             outf.write(file_content)
 
+def update_case_files(file_dict, case_path, old_file_dict=None):
+    """
+    增量写入 case 文件：只重写内容有变化的文件，并删除 old_file_dict 中有而 file_dict 中没有的文件，
+    网格、时间步结果等其他文件保持不变。
+
+    Args:
+        file_dict (dict): 新的输入文件，键为相对 case 目录的路径，值为文件内容字典。
+        case_path (str): case 目录的绝对路径。
+        old_file_dict (dict): 上一次写入的输入文件。
+
+    Returns:
+        list: 被重写或删除的文件的相对路径。
+    """
+    changed_files = []
+    for rel_path in file_dict:
+        file_path = os.path.join(case_path, rel_path)
+        file_content = body(file_dict[rel_path])
+        if os.path.isfile(file_path):
+            with open(file_path, 'r', errors='replace') as f:
+                if f.read() == file_content:
+                    continue
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as outf:
+            outf.write(file_content)
+        changed_files.append(rel_path)
+
+    for rel_path in old_file_dict or {}:
+        file_path = os.path.join(case_path, rel_path)
+        if rel_path not in file_dict and os.path.isfile(file_path):
+            os.remove(file_path)
+            changed_files.append(rel_path)
+    return changed_files
+
+def copy_mesh_files(mesh_path, case_path, update=False):
+    """
+    将 mesh_path 中的网格文件复制到 case 目录下对应的位置。
+
+    Args:
+        mesh_path (str): 以 ';' 分隔的网格文件/目录的绝对路径。
+        case_path (str): case 目录的绝对路径。
+        update (bool): 为 True 时跳过 case 中已存在且内容相同的文件与已存在的目录。
+    """
+    for source_mesh_path in mesh_path.split(';'):
+        source_mesh_path = source_mesh_path.rstrip('/')
+        system_index = source_mesh_path.rfind('system/')
+        constant_index = source_mesh_path.rfind('constant/')
+        if system_index > 0:
+            rel_mesh_path = source_mesh_path[system_index:]
+        elif constant_index > 0:
+            rel_mesh_path = source_mesh_path[constant_index:]
+        elif os.path.basename(source_mesh_path) in ('blockMeshDict', 'blockMeshDict.m4'):
+            rel_mesh_path = os.path.join('system', os.path.basename(source_mesh_path))
+        elif os.path.basename(source_mesh_path) == 'polyMesh':
+            rel_mesh_path = os.path.join('constant', 'polyMesh')
+        else:
+            rel_mesh_path = os.path.join('constant', 'polyMesh', os.path.basename(source_mesh_path))
+
+        destination_mesh_path = os.path.join(case_path, rel_mesh_path)
+        if update and os.path.isdir(destination_mesh_path) and os.path.isdir(source_mesh_path):
+            continue
+        if update and os.path.isfile(destination_mesh_path) and filecmp.cmp(source_mesh_path, destination_mesh_path, shallow=False):
+            continue
+        # 确保文件的目录存在
+        os.makedirs(os.path.dirname(destination_mesh_path), exist_ok=True)
+        if os.path.isdir(source_mesh_path):
+            shutil.copytree(source_mesh_path, destination_mesh_path, dirs_exist_ok=True)
+        else:
+            shutil.copy(source_mesh_path, destination_mesh_path)
+        log_with_time(f"copy mesh file: {source_mesh_path} to {destination_mesh_path}")
+
+def set_foam_dict_entry(file_path, key, value):
+    """
+    修改 OpenFOAM 字典文件中第一个名为 key 的条目的值，不存在时追加到文件末尾。
+
+    Args:
+        file_path (str): 字典文件路径，例如 case_dir/system/controlDict。
+        key (str): 条目名称，例如 'stopAt'。
+        value (str): 新的值，例如 'writeNow'。
+    """
+    with open(file_path, 'r') as f:
+        content = f.read()
+    pattern = re.compile(rf'^(\s*){re.escape(key)}\s+[^;{{}}]*;', re.MULTILINE)
+    if pattern.search(content):
+        content = pattern.sub(lambda m: f"{m.group(1)}{key}\t\t{value};", content, count=1)
+    else:
+        content = content.rstrip('\n') + f"\n\n{key}\t\t{value};\n"
+    with open(file_path, 'w') as f:
+        f.write(content)
+
+def get_foam_dict_entry(file_path, key):
+    """
+    读取 OpenFOAM 字典文件中第一个名为 key 的条目的值。
+
+    Args:
+        file_path (str): 字典文件路径，例如 case_dir/system/controlDict。
+        key (str): 条目名称，例如 'endTime'。
+
+    Returns:
+        str: 条目的值（去掉末尾的分号），不存在时返回 None。
+    """
+    with open(file_path, 'r') as f:
+        content = f.read()
+    match = re.search(rf'^\s*{re.escape(key)}\s+([^;{{}}]*);', content, re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+def is_steady_case(case_dir: str):
+    """根据求解器名称或 ddtSchemes 判断是否为稳态算例。"""
+    solver_name = get_solver_name(case_dir) if os.path.exists(f'{case_dir}/system/controlDict') else None
+    if solver_name and solver_name.lower().endswith('simplefoam'):
+        return True
+    fvSchemes_path = f'{case_dir}/system/fvSchemes'
+    if os.path.exists(fvSchemes_path):
+        with open(fvSchemes_path, 'r') as f:
+            return 'steadyState' in f.read()
+    return False
 
 def get_solver_name(case_dir: str):
     with open(f'{case_dir}/system/controlDict', 'r') as f:
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+TMP = tempfile.mkdtemp(prefix='autocfd_test_')
+
+# config_path 在导入时读取 CONFIG_FILE_PATH 并改写 MetaGPT 的 config2.yaml，这里全部指向临时目录
+os.makedirs(os.path.join(TMP, 'mg', 'config'), exist_ok=True)
+with open(os.path.join(TMP, 'mg', 'config', 'config2.yaml'), 'w') as f:
+    f.write("llm:\n  api_type: openai\n  model: ''\n")
+CONFIG_FILE = os.path.join(TMP, 'autocfd_tests.yaml')
+with open(CONFIG_FILE, 'w') as f:
+    f.write(f"description: autocfd tests\n"
+            f"mesh_path: Benchmark/mesh/Jet/blockMeshDict\n"
+            f"MetaGPT_PATH: {TMP}/mg\n"
+            f"max_loop: 10\n"
+            f"error_index: false\n"
+            f"cost_model_path: {TMP}/cost_model.json\n")
+os.environ['CONFIG_FILE_PATH'] = CONFIG_FILE
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
@@ -0,0 +1,45 @@
+"""concurrent_rewrite only merges the rewritten file under its own path and keeps the original file otherwise."""
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip("metagpt")
+pytest.importorskip("openai")
+
+import conftest  # noqa: E402,F401
+from actions.CorrectorAction import CorrectorAction  # noqa: E402
+
+FOAM_FILES = {
+    "system/controlDict": {"application": "icoFoam", "deltaT": "0.01"},
+    "system/fvSolution": {"solvers": {"p": {"solver": "PCG"}}},
+    "0/U": {"internalField": "uniform (0 0 0)"},
+}
+
+
+class FakeQA:
+    """按 prompt 中要重写的文件返回回复。"""
+
+    def __init__(self, responses):
+        self.responses = responses
+
+    async def ask(self, question, system_msg="", temperature=None):
+        return next(rsp for marker, rsp in self.responses.items() if marker in question)
+
+
+def test_rewrite_requires_file_path_key():
+    qa = FakeQA({
+        # 正确的回复：只有本文件
+        "to rewrite a OpenFoam controlDict": "```" + json.dumps({"system/controlDict": {"application": "icoFoam", "deltaT": "0.001"}}) + "```",
+        # 没有文件名外层的文件内容
+        "to rewrite a OpenFoam fvSolution": "```" + json.dumps({"solvers": {"p": {"solver": "GAMG"}}}) + "```",
+        # 错误的文件
+        "to rewrite a OpenFoam U": "```" + json.dumps({"0/p": {"internalField": "uniform 0"}}) + "```",
+    })
+    rewrite_files = [('controlDict', 'system'), ('fvSolution', 'system'), ('U', '0')]
+    merged = json.loads(asyncio.run(CorrectorAction().concurrent_rewrite(qa, rewrite_files, "error", json.dumps(FOAM_FILES))))
+
+    assert merged['system/controlDict']['deltaT'] == '0.001'
+    assert merged['system/fvSolution'] == FOAM_FILES['system/fvSolution']
+    assert merged['0/U'] == FOAM_FILES['0/U']
+    assert set(merged) == set(FOAM_FILES)
@@ -0,0 +1,112 @@
+"""Two Corrector loops running at the same time in one event loop must not share any state.
+
+The LLM is replaced by a stub that answers from the prompt, and the solver by
+writing the next FOAM FATAL ERROR log into the case directory.
+"""
+import os
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip("metagpt")
+pytest.importorskip("openai")
+
+import config_path  # noqa: E402
+from metagpt.schema import Message  # noqa: E402
+from run_context import RunContext  # noqa: E402
+from actions.CorrectorAction import CorrectorAction  # noqa: E402
+from utils.util import read_dict_and_create_files  # noqa: E402
+
+from conftest import TMP  # noqa: E402
+
+ROUNDS = 3
+TAGS = ('caseA', 'caseB')
+
+
+class FakeQA:
+    """按 prompt 回答的 LLM：找相关文件时返回 controlDict，重写时把本 case 的 tag 与轮次写入 controlDict。"""
+
+    def __init__(self, tag, statistics, calls):
+        self.tag = tag
+        self.statistics = statistics
+        self.calls = calls
+        self.prompts = []
+
+    async def ask(self, question, system_msg="", temperature=None):
+        self.prompts.append(question)
+        self.calls.append(self.tag)
+        self.statistics.total_tokens += 1
+        # 让出事件循环，使两个 Corrector 交错执行
+        await asyncio.sleep(0.01)
+        if 'to rewrite a OpenFoam' not in question:
+            return "<filename>controlDict</filename><filefolder>system</filefolder>"
+        return "```" + json.dumps({
+            "system/controlDict": {"application": "icoFoam", "tag": self.tag, "round": str(self.statistics.loop)},
+            "0/U": {"tag": self.tag},
+        }) + "```"
+
+    def close(self):
+        pass
+
+
+def write_error_log(case_path, tag, round_index):
+    with open(os.path.join(case_path, 'log.icoFoam'), 'w') as f:
+        f.write(f"Create time\n\n--> FOAM FATAL IO ERROR: ({tag} round {round_index})\n"
+                f"keyword tag{round_index} is undefined in dictionary \"{case_path}/system/controlDict\"\n\n"
+                f"FOAM exiting\n")
+
+
+async def corrector_loop(run_ctx, tag, calls):
+    input_files = {"system/controlDict": {"application": "icoFoam", "tag": tag}, "0/U": {"tag": tag}}
+    read_dict_and_create_files(input_files, run_ctx.case_path)
+    run_ctx.qa_ori = FakeQA(tag, run_ctx.statistics, calls)
+    history = [
+        Message(content=config_path.usr_requirment, role='Prechecker'),
+        Message(content="# Foam files:\n" + json.dumps(input_files) + "\n# Allrun script:\nicoFoam", role='InputWriter'),
+    ]
+    for round_index in range(ROUNDS):
+        # 求解器：写出本轮的报错日志
+        write_error_log(run_ctx.case_path, tag, round_index)
+        history.append(Message(content="error<command>icoFoam", role='Runner'))
+        rsp = await CorrectorAction().run(history, run_ctx=run_ctx)
+        history.append(Message(content=rsp, role='Corrector'))
+    return history
+
+
+def test_two_corrector_loops_do_not_share_state():
+    run_ctxs = []
+    for tag in TAGS:
+        run_ctx = RunContext()
+        run_ctx.case_path = os.path.join(TMP, 'run', tag)
+        os.makedirs(run_ctx.case_path)
+        run_ctxs.append(run_ctx)
+    calls = []
+
+    async def run_both():
+        return await asyncio.gather(*[corrector_loop(run_ctx, tag, calls) for run_ctx, tag in zip(run_ctxs, TAGS)])
+
+    histories = asyncio.run(run_both())
+
+    # 两个 Corrector 确实交错执行
+    first_done = min(len(calls) - calls[::-1].index(tag) for tag in TAGS)
+    assert set(calls[:first_done]) == set(TAGS)
+
+    for run_ctx, tag, history in zip(run_ctxs, TAGS, histories):
+        other = next(t for t in TAGS if t != tag)
+        # prompt 只包含本 case 的报错与输入文件
+        assert run_ctx.qa_ori.prompts
+        assert all(other not in prompt for prompt in run_ctx.qa_ori.prompts)
+        # 统计互不影响：每轮一次找文件、一次重写
+        assert run_ctx.statistics.loop == ROUNDS
+        assert run_ctx.statistics.total_tokens == 2 * ROUNDS
+        # 历史只包含本 case 的修正
+        corrections = [msg.content for msg in history if msg.role == 'Corrector']
+        assert len(corrections) == ROUNDS
+        assert all(json.loads(c)['system/controlDict']['tag'] == tag for c in corrections)
+        # case 目录中只有本 case 的文件
+        with open(os.path.join(run_ctx.case_path, 'system', 'controlDict')) as f:
+            control_dict = f.read()
+        assert tag in control_dict and other not in control_dict
+        assert f"round {ROUNDS}" in ' '.join(control_dict.split())
+        run_ctx.close()
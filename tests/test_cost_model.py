@@ -0,0 +1,62 @@
+"""Cost model estimates: the number of time steps is only known for a fixed deltaT, and calibration starts at the first solver time step."""
+import os
+
+from utils.cost_model import CostModel
+from utils.log_monitor import FoamLogMonitor
+
+from conftest import TMP
+
+BLOCK_MESH_DICT = """
+vertices ((0 0 0) (1 0 0) (1 1 0) (0 1 0) (0 0 1) (1 0 1) (1 1 1) (0 1 1));
+blocks (hex (0 1 2 3 4 5 6 7) (100 100 1) simpleGrading (1 1 1));
+"""
+
+
+def make_case(name, control_dict, allrun="#!/bin/sh\nicoFoam\n"):
+    case_path = os.path.join(TMP, 'cost_model', name)
+    os.makedirs(os.path.join(case_path, 'system'))
+    with open(os.path.join(case_path, 'system', 'controlDict'), 'w') as f:
+        f.write("application     icoFoam;\nstartTime       0;\nendTime         1;\n" + control_dict)
+    with open(os.path.join(case_path, 'system', 'blockMeshDict'), 'w') as f:
+        f.write(BLOCK_MESH_DICT)
+    with open(os.path.join(case_path, 'Allrun'), 'w') as f:
+        f.write(allrun)
+    return case_path
+
+
+def cost_model(name):
+    return CostModel(os.path.join(TMP, 'cost_model', f'{name}.json'), safety_factor=5, min_timeout=600,
+                     max_timeout=12 * 60 * 60, mesh_allowance=300)
+
+
+def test_fixed_time_step():
+    case_path = make_case('fixed', "deltaT          0.001;\n")
+    estimate = cost_model('fixed').estimate(case_path)
+    assert (estimate['cells'], estimate['steps']) == (10000, 1000)
+    assert estimate['seconds'] == 10000 * 1000 * 5e-6
+    assert estimate['timeout'] == 600
+
+
+def test_adjustable_time_step_uses_max_timeout():
+    # Courant 数限制下的时间步可能远小于 maxDeltaT，不能按 maxDeltaT 估计时间步数
+    case_path = make_case('adjustable', "deltaT          0.001;\nadjustTimeStep  yes;\nmaxCo           0.5;\nmaxDeltaT       1;\n",
+                          allrun="#!/bin/sh\nblockMesh\nicoFoam\n")
+    estimate = cost_model('adjustable').estimate(case_path)
+    assert estimate['steps'] is None and estimate['seconds'] is None
+    assert estimate['timeout'] == 12 * 60 * 60
+
+
+def test_mesh_allowance():
+    case_path = make_case('meshing', "deltaT          0.001;\n", allrun="#!/bin/sh\nblockMesh\nicoFoam\n")
+    assert cost_model('meshing').estimate(case_path)['timeout'] == 600 + 300
+
+
+def test_monitor_records_first_solver_step():
+    monitor = FoamLogMonitor(TMP)
+    monitor.parse_line("Create mesh for time = 0", 'log.icoFoam')
+    assert monitor.first_step_time is None
+    monitor.parse_line("Time = 0.001", 'log.icoFoam')
+    first_step_time = monitor.first_step_time
+    assert first_step_time is not None
+    monitor.parse_line("Time = 0.002", 'log.icoFoam')
+    assert monitor.first_step_time == first_step_time and monitor.steps == 2
@@ -0,0 +1,134 @@
+"""Error signature index: recorded fixes are only applied where they fit the case, and a fix is only credited
+when the command that failed before ran again without an error."""
+import os
+import json
+import asyncio
+
+import pytest
+
+import config_path
+from utils.error_index import ErrorFixIndex, error_signature
+
+from conftest import TMP
+
+SIGNATURE = 'keyword nCorrectors is undefined in dictionary "system/fvSolution/PISO"'
+FOREIGN_SIGNATURE = 'Cannot find patchField entry for jetInlet'
+
+FOAM_FILES = {
+    "system/fvSolution": {"solvers": {"p": {"solver": "PCG"}}, "PISO": {"nNonOrthogonalCorrectors": "0"}},
+    "0/U": {"boundaryField": {"inlet": {"type": "fixedValue"}, "outlet": {"type": "zeroGradient"}}},
+}
+
+
+def make_index(name, fixes):
+    index = ErrorFixIndex(os.path.join(TMP, 'error_index', f'{name}.json'))
+    index.fixes = fixes
+    return index
+
+
+def test_learned_ops_outside_the_case_are_skipped():
+    learned = [
+        {'op': 'set', 'path': ['0/U', 'boundaryField', 'jetInlet', 'type'], 'value': 'fixedValue'},
+        {'op': 'set', 'path': ['constant/foreignDict', 'entry'], 'value': '1'},
+        {'op': 'set', 'path': ['0/U', 'boundaryField', 'inlet', 'value'], 'value': 'uniform (1 0 0)'},
+    ]
+    index = make_index('foreign_ops', {'icoFoam': {FOREIGN_SIGNATURE: [{'ops': learned, 'success': 3, 'attempts': 3}]}})
+    assert index.candidates(FOREIGN_SIGNATURE, 'icoFoam', FOAM_FILES) == [([learned[2]], 'learned', 0.8)]
+
+    only_foreign = make_index('only_foreign_ops', {'icoFoam': {FOREIGN_SIGNATURE: [{'ops': learned[:2], 'success': 3, 'attempts': 3}]}})
+    assert only_foreign.candidates(FOREIGN_SIGNATURE, 'icoFoam', FOAM_FILES) == []
+
+
+def test_other_solvers_only_share_known_fixes():
+    known = [{'op': 'set', 'path': ['system/fvSolution', 'PISO', 'nCorrectors'], 'value': '2'}]
+    learned = [{'op': 'set', 'path': ['system/fvSolution', 'PISO', 'nCorrectors'], 'value': '4'}]
+    index = make_index('other_solver', {'pisoFoam': {SIGNATURE: [{'ops': learned, 'success': 5, 'attempts': 5},
+                                                                 {'ops': known, 'success': 2, 'attempts': 2}]}})
+    assert index.candidates(SIGNATURE, 'icoFoam', FOAM_FILES) == [(known, 'known', 0.75)]
+    assert index.candidates(SIGNATURE, 'pisoFoam', FOAM_FILES)[0] == (learned, 'learned', 6 / 7)
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    pytest.importorskip("metagpt")
+    pytest.importorskip("openai")
+    from run_context import RunContext
+    from actions.RunnerAction import RunnerAction
+    monkeypatch.setattr(config_path, 'error_index_path', os.path.join(TMP, 'error_index', 'pending.json'))
+    if os.path.exists(config_path.error_index_path):
+        os.remove(config_path.error_index_path)
+    run_ctx = RunContext()
+    run_ctx.case_path = os.path.join(TMP, 'error_index', 'case')
+    os.makedirs(run_ctx.case_path, exist_ok=True)
+    for log_file in [f for f in os.listdir(run_ctx.case_path) if f.startswith('log')]:
+        os.remove(os.path.join(run_ctx.case_path, log_file))
+    yield RunnerAction(), run_ctx
+    run_ctx.close()
+
+
+def resolve(runner, logs):
+    """以 logs {日志文件: 内容} 作为本次运行的日志判断上一次的修正，返回记录的 (success, attempts)。"""
+    action, run_ctx = runner
+    for log_file, content in logs.items():
+        with open(os.path.join(run_ctx.case_path, log_file), 'w') as f:
+            f.write(content)
+    ops = [{'op': 'set', 'path': ['system/fvSolution', 'PISO', 'nCorrectors'], 'value': '2'}]
+    run_ctx.pending_fix = {'signature': SIGNATURE, 'solver': 'icoFoam', 'ops': ops, 'source': 'llm', 'command': 'icoFoam'}
+    action.resolve_pending_fix(run_ctx, action.check_foam_errors(run_ctx.case_path))
+    fixes = ErrorFixIndex(config_path.error_index_path).fixes.get('icoFoam', {}).get(SIGNATURE, [])
+    return (fixes[0]['success'], fixes[0]['attempts']) if fixes else None
+
+
+def error_log(message):
+    return f"Create time\n\n--> FOAM FATAL IO ERROR:\n{message}\n\nFOAM exiting\n"
+
+
+def test_fix_is_credited_when_the_command_runs_cleanly(runner):
+    assert error_signature(error_log(SIGNATURE)) == SIGNATURE
+    assert resolve(runner, {'log.blockMesh': "End\n", 'log.icoFoam': "Time = 0.1\nEnd\n"}) == (1, 1)
+
+
+def test_fix_fails_when_the_error_remains(runner):
+    assert resolve(runner, {'log.icoFoam': error_log(SIGNATURE)}) == (0, 1)
+
+
+def test_fix_is_not_credited_when_an_earlier_command_fails(runner):
+    assert resolve(runner, {'log.blockMesh': error_log("Cannot open file blockMeshDict")}) is None
+
+
+def test_fix_is_not_credited_when_the_command_fails_differently(runner):
+    assert resolve(runner, {'log.icoFoam': error_log("keyword div(phi,U) is undefined")}) is None
+
+
+class RewriteQA:
+    """找相关文件时只返回 controlDict，重写时却同时改写了 controlDict 与 0/U。"""
+
+    async def ask(self, question, system_msg="", temperature=None):
+        if 'to rewrite a OpenFoam' not in question:
+            return "<filename>controlDict</filename><filefolder>system</filefolder>"
+        return '```{"system/controlDict": {"application": "icoFoam", "nCorrectors": "2"}, "0/U": {"boundaryField": {"jetInlet": {}}}}```'
+
+    def close(self):
+        pass
+
+
+def test_llm_fix_only_records_the_linked_files(runner, monkeypatch):
+    from metagpt.schema import Message
+    from actions.CorrectorAction import CorrectorAction
+    from utils.util import read_dict_and_create_files
+    _, run_ctx = runner
+    monkeypatch.setattr(config_path, 'error_index', True)
+    input_files = {"system/controlDict": {"application": "icoFoam"}, "0/U": {"boundaryField": {"inlet": {}}}}
+    read_dict_and_create_files(input_files, run_ctx.case_path)
+    with open(os.path.join(run_ctx.case_path, 'log.icoFoam'), 'w') as f:
+        f.write(error_log(f'keyword nCorrectors is undefined in dictionary "{run_ctx.case_path}/system/controlDict"'))
+    run_ctx.qa_ori = RewriteQA()
+    history = [
+        Message(content=config_path.usr_requirment, role='Prechecker'),
+        Message(content="# Foam files:\n" + json.dumps(input_files) + "\n# Allrun script:\nicoFoam", role='InputWriter'),
+        Message(content="error<command>icoFoam", role='Runner'),
+    ]
+    asyncio.run(CorrectorAction().run(history, run_ctx=run_ctx))
+
+    assert run_ctx.pending_fix['ops'] == [{'op': 'set', 'path': ['system/controlDict', 'nCorrectors'], 'value': '2'}]
+    assert run_ctx.pending_fix['command'] == 'icoFoam'
@@ -0,0 +1,174 @@
+"""Incremental validation of the streamed Foam Files JSON: no false positives on valid documents fed in any chunking,
+and early errors for missing patches, missing boundaryField, invalid literals and escapes."""
+import json
+import random
+
+import pytest
+
+from utils.json_stream import FoamFilesStreamValidator
+
+PATCHES = ['inlet', 'outlet', 'walls']
+
+FOAM_FILES = {
+    "system/controlDict": {"application": "icoFoam", "startTime": 0, "endTime": 0.5, "deltaT": 5e-3,
+                           "runTimeModifiable": True, "functions": None, "libs": ["\"libforces.so\""]},
+    "system/fvSchemes": {"divSchemes": {"default": "none", "div(phi,U)": "Gauss linear"}},
+    "0/U": {"dimensions": "[0 1 -1 0 0 0 0]", "internalField": "uniform (0 0 0)",
+            "boundaryField": {"inlet": {"type": "fixedValue", "value": "uniform (1 0 0)"},
+                              "outlet": {"type": "zeroGradient"},
+                              "walls": {"type": "noSlip"}}},
+    "0/p": {"dimensions": "[0 2 -2 0 0 0 0]", "internalField": "uniform 0",
+            "boundaryField": {"inlet": {"type": "zeroGradient"},
+                              "outlet": {"type": "fixedValue", "value": "uniform 0"},
+                              "walls": {"type": "zeroGradient"}}},
+}
+
+
+def response(foam_files, indent=4, allrun="blockMesh\nicoFoam"):
+    return f"Here are the files.\n# Foam files:\n{json.dumps(foam_files, indent=indent)}\n# Allrun script:\n```sh\n{allrun}\n```"
+
+
+def feed_chunks(text, chunk_sizes, patch_names=PATCHES):
+    validator = FoamFilesStreamValidator(patch_names)
+    position = 0
+    for size in chunk_sizes:
+        validator.feed(text[position:position + size])
+        position += size
+    validator.feed(text[position:])
+    return validator
+
+
+@pytest.mark.parametrize('indent', [None, 4])
+def test_valid_document_one_character_chunks(indent):
+    text = response(FOAM_FILES, indent)
+    assert feed_chunks(text, [1] * len(text)).done
+
+
+def test_valid_document_random_chunks():
+    text = response(FOAM_FILES)
+    rng = random.Random(0)
+    for _ in range(50):
+        sizes = [rng.randint(1, 40) for _ in range(len(text) // 10)]
+        assert feed_chunks(text, sizes).done
+
+
+def test_escapes_and_control_characters_in_strings():
+    # 与 json.loads(strict=False) 一致：字符串中允许转义与原样的控制字符
+    foam_files = dict(FOAM_FILES, **{"system/note": {"text": "tab\there \\\"quoted\\\" é \\u00e9 \\/ line\nbreak"}})
+    text = '# Foam files:\n{"system/note": {"text": "a\\"b\\\\c\\/d\\b\\f\\n\\r\\t\\u00e9\tline\nbreak"}, ' + json.dumps(foam_files)[1:]
+    json.loads(text[text.index('{'):], strict=False)
+    assert feed_chunks(text, [1] * len(text)).done
+
+
+def test_prefixes_of_valid_documents_never_fail():
+    # 流式生成中任何时刻的前缀都不能被误判
+    text = response(FOAM_FILES)
+    validator = FoamFilesStreamValidator(PATCHES)
+    for char in text[:text.index('# Allrun')]:
+        validator.feed(char)
+
+
+def test_text_after_the_document_is_ignored():
+    validator = feed_chunks(response(FOAM_FILES, allrun="{ not json ]"), [7] * 200)
+    assert validator.done
+
+
+@pytest.mark.parametrize('field', ['0/U', '0/p'])
+def test_missing_patch(field):
+    foam_files = json.loads(json.dumps(FOAM_FILES))
+    del foam_files[field]['boundaryField']['outlet']
+    text = response(foam_files)
+    with pytest.raises(ValueError, match=r"outlet"):
+        feed_chunks(text, [1] * len(text))
+
+
+def test_missing_patch_is_reported_when_the_boundary_field_closes():
+    foam_files = json.loads(json.dumps(FOAM_FILES))
+    del foam_files['0/U']['boundaryField']['walls']
+    text = response(foam_files, indent=None)
+    end = text.index('}}', text.index('"0/U"') + len('"0/U": {"dimensions"')) + 2
+    validator = FoamFilesStreamValidator(PATCHES)
+    validator.feed(text[:end - 1])
+    with pytest.raises(ValueError, match=r"walls"):
+        validator.feed(text[end - 1:end])
+
+
+def test_missing_boundary_field():
+    foam_files = json.loads(json.dumps(FOAM_FILES))
+    del foam_files['0/p']['boundaryField']
+    with pytest.raises(ValueError, match=r"0/p has no boundaryField"):
+        feed_chunks(response(foam_files), [5] * 400)
+
+
+def test_missing_field_file():
+    foam_files = {key: value for key, value in FOAM_FILES.items() if key != '0/p'}
+    with pytest.raises(ValueError, match=r"0/p"):
+        feed_chunks(response(foam_files), [5] * 400)
+
+
+def test_no_patch_check_without_mesh_patches():
+    foam_files = {key: value for key, value in FOAM_FILES.items() if key not in ('0/U', '0/p')}
+    assert feed_chunks(response(foam_files), [3] * 300, patch_names=['', '']).done
+
+
+@pytest.mark.parametrize('literal', ['tru', 'True', 'nul', '01', '1.', '-', '1e', 'NaNx', '.5'])
+def test_invalid_literals(literal):
+    text = '# Foam files:\n{"system/controlDict": {"endTime": ' + literal + ', "deltaT": 1}}'
+    with pytest.raises(ValueError):
+        json.loads(text[text.index('{'):], strict=False)
+    with pytest.raises(ValueError):
+        feed_chunks(text, [1] * len(text), patch_names=[])
+
+
+@pytest.mark.parametrize('literal', ['true', 'false', 'null', 'NaN', 'Infinity', '-Infinity', '-0', '1.5e-3', '2E+10'])
+def test_valid_literals(literal):
+    text = '# Foam files:\n{"system/controlDict": {"endTime": ' + literal + ', "values": [' + literal + ']}}'
+    json.loads(text[text.index('{'):], strict=False)
+    assert feed_chunks(text, [1] * len(text), patch_names=[]).done
+
+
+@pytest.mark.parametrize('escape', ['\\x41', '\\a', '\\ ', "\\'", '\\u00g1', '\\u12"'])
+def test_invalid_escapes(escape):
+    text = '# Foam files:\n{"system/controlDict": {"application": "ico' + escape + 'Foam"}}'
+    with pytest.raises(ValueError):
+        json.loads(text[text.index('{'):], strict=False)
+    with pytest.raises(ValueError, match=r"invalid escape"):
+        feed_chunks(text, [1] * len(text), patch_names=[])
+
+
+@pytest.mark.parametrize('document', ['{"a": 1,}', '{"a" 1}', '{"a": [1 2]}', '{"a": 1]', '{1: 2}'])
+def test_invalid_structure(document):
+    with pytest.raises(ValueError):
+        json.loads(document, strict=False)
+    with pytest.raises(ValueError):
+        feed_chunks('# Foam files:\n' + document + ' ', [1] * 40, patch_names=[])
+
+
+def test_random_corruptions_agree_with_the_json_decoder():
+    # 随机删除、插入或替换一个字符：JSON 能解析时校验不能报错，校验完整结束时 JSON 必须能解析。
+    # 校验从 "# Foam files:" 之后的第一个 { 开始、在顶层对象结束时停止，所以不改动开头的 {，并忽略对象之后的内容（raw_decode）
+    document = json.dumps(FOAM_FILES)
+    rng = random.Random(1)
+    alphabet = '{}[]:,"\\ 0123456789.-+eEtrufalsnNIiy\nabc'
+    for _ in range(3000):
+        position = rng.randrange(1, len(document))
+        operation = rng.choice(('delete', 'insert', 'replace'))
+        if operation == 'delete':
+            corrupted = document[:position] + document[position + 1:]
+        elif operation == 'insert':
+            corrupted = document[:position] + rng.choice(alphabet) + document[position:]
+        else:
+            corrupted = document[:position] + rng.choice(alphabet) + document[position + 1:]
+        try:
+            json.JSONDecoder(strict=False).raw_decode(corrupted)
+            parsed = True
+        except ValueError:
+            parsed = False
+        validator = FoamFilesStreamValidator([])
+        try:
+            # 末尾的空格结束最后一个数字字面量
+            validator.feed('# Foam files:\n' + corrupted + ' ')
+            valid = validator.done
+        except ValueError:
+            valid = False
+        assert valid == parsed, corrupted
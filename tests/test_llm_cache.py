@@ -0,0 +1,118 @@
+"""LLM response cache: LRU eviction and expiry of the sqlite cache; CachedQA caches sampled answers per repetition,
+shares only temperature 0 answers across repetitions, and never caches aborted generations."""
+import os
+import time
+import asyncio
+
+import pytest
+
+import config_path
+from Statistics import Statistics
+from utils.llm_cache import LLMResponseCache, request_hash
+
+from conftest import TMP
+
+
+@pytest.fixture
+def qa_module(monkeypatch, request):
+    # CachedQA 所在的 qa_module 依赖 openai 与 httpx，缓存本身只依赖标准库
+    pytest.importorskip("openai")
+    pytest.importorskip("httpx")
+    import qa_module
+    monkeypatch.setattr(config_path, 'llm_cache', True)
+    monkeypatch.setattr(config_path, 'llm_cache_path', os.path.join(TMP, f'llm_cache_{request.node.name}.sqlite'))
+    return qa_module
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = LLMResponseCache(os.path.join(TMP, 'llm_cache_lru.sqlite'), max_entries=2)
+    cache.put('a', 'answer a')
+    time.sleep(0.01)
+    cache.put('b', 'answer b')
+    time.sleep(0.01)
+    assert cache.get('a') == 'answer a'
+    time.sleep(0.01)
+    cache.put('c', 'answer c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'answer a'
+    assert cache.get('c') == 'answer c'
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_expired_entries_are_misses():
+    cache = LLMResponseCache(os.path.join(TMP, 'llm_cache_ttl.sqlite'), ttl=0.05)
+    cache.put('a', 'answer a')
+    assert cache.get('a') == 'answer a'
+    time.sleep(0.1)
+    assert cache.get('a') is None
+
+
+def ask_twice(qa_module, runtimes, temperature):
+    """一个 repetition 中把同一请求发送两次，返回两次的回复。"""
+    qa = qa_module.CachedQA(Statistics(), runtimes)
+
+    async def run():
+        answers = []
+        for _ in range(2):
+            async def ask():
+                return f"answer {runtimes}.{len(answers)}"
+            answers.append(await qa.cached_ask('model', temperature, 'question', 'system', ask))
+        return answers
+
+    return asyncio.run(run()), qa.statistics
+
+
+@pytest.mark.parametrize('temperature', [0.7, None])
+def test_sampled_answers_are_not_shared_across_repetitions(qa_module, temperature):
+    assert ask_twice(qa_module, 1, temperature)[0] == ['answer 1.0', 'answer 1.1']
+    answers, statistics = ask_twice(qa_module, 2, temperature)
+    assert answers == ['answer 2.0', 'answer 2.1']
+    assert statistics.llm_cache_misses == 2
+    # 再次运行同一 repetition 时按顺序命中
+    answers, statistics = ask_twice(qa_module, 1, temperature)
+    assert answers == ['answer 1.0', 'answer 1.1']
+    assert statistics.llm_cache_hits == 2
+
+
+def test_greedy_answers_are_shared_across_repetitions(qa_module):
+    assert ask_twice(qa_module, 1, 0)[0] == ['answer 1.0', 'answer 1.1']
+    answers, statistics = ask_twice(qa_module, 2, 0)
+    assert answers == ['answer 1.0', 'answer 1.1']
+    assert statistics.llm_cache_hits == 2
+
+
+def test_aborted_generation_is_not_cached(qa_module):
+    qa = qa_module.CachedQA(Statistics())
+
+    async def abort():
+        raise qa_module.GenerationAborted("missing inlet")
+
+    with pytest.raises(qa_module.GenerationAborted):
+        asyncio.run(qa.cached_ask('model', None, 'question', 'system', abort))
+    assert qa.cache.get(f"{request_hash('model', None, 'system', 'question')}:1:0") is None
+
+
+def test_answer_after_an_abort_is_a_hit_on_rerun(qa_module):
+    async def run(qa, answers):
+        # 第一次生成被中止后重新生成，或请求失败后重新请求
+        result = None
+        while result is None:
+            async def ask():
+                answer = answers.pop(0)
+                if isinstance(answer, Exception):
+                    raise answer
+                return answer
+            try:
+                result = await qa.cached_ask('model', None, 'question', 'system', ask)
+            except qa_module.GenerationAborted:
+                pass
+        return result
+
+    qa = qa_module.CachedQA(Statistics())
+    assert asyncio.run(run(qa, [qa_module.GenerationAborted("missing inlet"), None, "accepted"])) == "accepted"
+    assert qa.statistics.llm_cache_misses == 3
+
+    rerun = qa_module.CachedQA(Statistics())
+    assert asyncio.run(run(rerun, [])) == "accepted"
+    assert (rerun.statistics.llm_cache_hits, rerun.statistics.llm_cache_misses) == (1, 0)
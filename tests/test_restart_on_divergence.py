@@ -0,0 +1,110 @@
+"""The divergence branch of the Corrector with restart_on_divergence: the case continues from the last complete time step before the divergence,
+and the smoke run of the restarted case runs from that time step."""
+import os
+import json
+import shutil
+import asyncio
+
+import pytest
+
+pytest.importorskip("metagpt")
+pytest.importorskip("openai")
+
+import config_path  # noqa: E402
+from metagpt.schema import Message  # noqa: E402
+from run_context import RunContext  # noqa: E402
+from actions.CorrectorAction import CorrectorAction  # noqa: E402
+from actions.RunnerAction import RunnerAction  # noqa: E402
+from utils.cost_model import CostModel  # noqa: E402
+from utils.util import read_dict_and_create_files, get_foam_dict_entry  # noqa: E402
+
+from conftest import TMP  # noqa: E402
+
+FOAM_FILES = {
+    "system/controlDict": {"application": "icoFoam", "startFrom": "startTime", "startTime": "0",
+                           "endTime": "1", "deltaT": "0.01", "writeInterval": "10"},
+    "system/fvSchemes": {"ddtSchemes": {"default": "Euler"}},
+    "0/U": {"internalField": "uniform (0 0 0)"},
+    "0/p": {"internalField": "uniform 0"},
+}
+
+
+def make_case(name, allrun):
+    """写出输入文件与求解器已写出的时间步：0.1、0.2 完整，0.3 被终止时只写出了 U。"""
+    case_path = os.path.join(TMP, 'restart', name)
+    os.makedirs(case_path)
+    read_dict_and_create_files(FOAM_FILES, case_path)
+    for time_name, fields in (('0.1', ('U', 'p')), ('0.2', ('U', 'p')), ('0.3', ('U',))):
+        os.makedirs(os.path.join(case_path, time_name, 'uniform'))
+        for field in fields:
+            with open(os.path.join(case_path, time_name, field), 'w') as f:
+                f.write(f"internalField uniform {time_name};\n")
+        with open(os.path.join(case_path, time_name, 'uniform', 'time'), 'w') as f:
+            f.write("value 0;\ndeltaT 0.01;\ndeltaT0 0.01;\n")
+    os.makedirs(os.path.join(case_path, 'postProcessing'))
+    with open(os.path.join(case_path, 'Allrun'), 'w') as f:
+        f.write(allrun)
+    return case_path
+
+
+def run_divergence(case_path, monkeypatch):
+    monkeypatch.setattr(config_path, 'restart_on_divergence', True)
+    monkeypatch.setattr(config_path, 'divergence_rules', True)
+    run_ctx = RunContext()
+    run_ctx.case_path = case_path
+    run_ctx.divergence = {'file': 'log.icoFoam', 'time': '0.35', 'reason': 'Courant Number mean: 1e+10'}
+    history = [
+        Message(content=config_path.usr_requirment, role='Prechecker'),
+        Message(content="# Foam files:\n" + json.dumps(FOAM_FILES) + "\n# Allrun script:\nicoFoam", role='InputWriter'),
+        Message(content="divergence<command>icoFoam", role='Runner'),
+    ]
+    try:
+        return json.loads(asyncio.run(CorrectorAction().run(history, run_ctx=run_ctx)))
+    finally:
+        run_ctx.close()
+
+
+def test_restart_from_last_complete_time_step(monkeypatch):
+    case_path = make_case('restart', "#!/bin/sh\nblockMesh\nicoFoam\n")
+    input_files = run_divergence(case_path, monkeypatch)
+
+    assert input_files['system/controlDict']['deltaT'] == '0.001'
+    # 从 0.2 继续计算：保留 0.2 与 postProcessing，删除不完整的 0.3 与更早的 0.1
+    assert sorted(name for name in os.listdir(case_path) if CorrectorAction.is_time_dir(name)) == ['0', '0.2']
+    assert os.path.isdir(os.path.join(case_path, 'postProcessing'))
+    control_dict = os.path.join(case_path, 'system', 'controlDict')
+    assert get_foam_dict_entry(control_dict, 'startFrom') == 'latestTime'
+    assert get_foam_dict_entry(control_dict, 'deltaT') == '0.001'
+    assert get_foam_dict_entry(os.path.join(case_path, '0.2', 'uniform', 'time'), 'deltaT') == '0.001'
+
+
+def test_no_restart_when_allrun_initializes_fields(monkeypatch):
+    case_path = make_case('set_fields', "#!/bin/sh\nblockMesh\nsetFields\nicoFoam\n")
+    run_divergence(case_path, monkeypatch)
+
+    # setFields 会重新初始化场，从头计算
+    assert sorted(name for name in os.listdir(case_path) if CorrectorAction.is_time_dir(name)) == ['0']
+    assert not os.path.exists(os.path.join(case_path, 'postProcessing'))
+    assert get_foam_dict_entry(os.path.join(case_path, 'system', 'controlDict'), 'startFrom') == 'startTime'
+
+
+def test_smoke_run_after_restart(monkeypatch):
+    case_path = make_case('smoke', "#!/bin/sh\nblockMesh\nicoFoam\n")
+    run_divergence(case_path, monkeypatch)
+    # Allrun 由 RunnerAction 重新生成
+    with open(os.path.join(case_path, 'Allrun'), 'w') as f:
+        f.write("#!/bin/sh\nblockMesh\nicoFoam\n")
+    smoke_path = f"{case_path}_smoke"
+    shutil.copytree(case_path, smoke_path)
+    with open(os.path.join(smoke_path, 'system', 'blockMeshDict')) as f:
+        block_mesh_dict = f.read()
+
+    assert RunnerAction().reduce_smoke_case(smoke_path, n_steps=5, coarse_factor=2)
+    # endTime 从 0.2 开始计算，不会落在重启时间之前而一步都不运行
+    assert float(get_foam_dict_entry(os.path.join(smoke_path, 'system', 'controlDict'), 'endTime')) == pytest.approx(0.205)
+    # 0.2 的场与原网格对应，不粗化网格
+    with open(os.path.join(smoke_path, 'system', 'blockMeshDict')) as f:
+        assert f.read() == block_mesh_dict
+    estimate = CostModel(os.path.join(TMP, 'restart', 'cost_model.json')).estimate(case_path)
+    assert estimate['start_time'] == 0.2
+    assert estimate['steps'] == 800
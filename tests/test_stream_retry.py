@@ -0,0 +1,51 @@
+"""Streaming Foam Files generation: only validation aborts are regenerated, failed requests are returned immediately."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("metagpt")
+pytest.importorskip("openai")
+
+import config_path  # noqa: E402
+from qa_module import GenerationAborted  # noqa: E402
+from actions.InputWriterAction import InputWriterAction, MAX_STREAM_ABORTS  # noqa: E402
+
+import conftest  # noqa: E402,F401
+
+
+class FakeQA:
+    """依次返回 results 中的回复；为异常时抛出。"""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.validated = []
+
+    async def ask(self, question, system_msg="", validate=None):
+        self.validated.append(validate is not None)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def ask_foam_files(qa, monkeypatch):
+    monkeypatch.setattr(config_path, 'openfoam_llm_stream', True)
+    return asyncio.run(InputWriterAction().ask_foam_files(qa, 'prompt', 'system', ['inlet']))
+
+
+def test_regenerates_after_validation_abort(monkeypatch):
+    qa = FakeQA([GenerationAborted("missing inlet"), GenerationAborted("missing inlet"), "# Foam files:\n{}"])
+    assert ask_foam_files(qa, monkeypatch) == "# Foam files:\n{}"
+    assert qa.validated == [True, True, True]
+
+
+def test_failed_request_is_not_retried(monkeypatch):
+    qa = FakeQA([None, "# Foam files:\n{}"])
+    assert ask_foam_files(qa, monkeypatch) is None
+    assert qa.validated == [True]
+
+
+def test_unvalidated_fallback_after_max_aborts(monkeypatch):
+    qa = FakeQA([GenerationAborted("invalid JSON")] * MAX_STREAM_ABORTS + ["# Foam files:\n{}"])
+    assert ask_foam_files(qa, monkeypatch) == "# Foam files:\n{}"
+    assert qa.validated == [True] * MAX_STREAM_ABORTS + [False]